@@ -1,417 +1,95 @@
 import os
-from flask import Flask, request, jsonify, redirect, url_for, session, render_template, make_response
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from flask_sqlalchemy import SQLAlchemy
-from flask_mail import Mail, Message
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from app.models import User, Product, Order, OrderItem
-from flask_caching import Cache
-from flask_jwt_extended import jwt_required, get_jwt_identity
-import logging
-from flask_cors import cross_origin
-from logging.handlers import RotatingFileHandler
-from flask_session import Session
+from collections.abc import Mapping
+from flask import Flask
+from app import analytics, cart_store, compression, db_routing, headers, idempotency, metrics, order_export, product_import, profiling, request_logging, search, seed, session_store, size_options, slow_queries, typeahead
+from app.extensions import jwt, migrate, cache
 from app.models import db
-import stripe
-
-app = Flask(__name__, template_folder='templates', static_url_path='/nails', static_folder='nails')
-
-# Additional configuration for hosted environment
-app.config['ENV'] = 'production'
-app.config['DEBUG'] = False
-app.config.from_object(os.getenv('APP_SETTINGS'))
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-
-# Ensure a single, unified CORS configuration
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": ["https://localhost:3000", "https://nail-shop.onrender.com"]}})
-
-@app.route('/user', methods=['OPTIONS'])
-def user_options():
-    response = jsonify()
-    response.headers.add('Access-Control-Allow-Origin', 'https://nail-shop.onrender.com')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
-    response.headers.add('Access-Control-Allow-Headers', 'Authorization,Content-Type')
-    response.headers.add('Access-Control-Allow-Credentials', 'true')
-    return response
-
-@app.route('/user/<int:user_id>', methods=['GET'])
-def get_user(user_id):
-    try:
-        user = User.query.get(user_id)
-        if user:
-            return jsonify(user.to_response())
-        else:
-            return jsonify({'error': 'User not found'}), 404
-    except Exception as e:
-        return jsonify({'error': 'Failed to fetch user', 'message': str(e)}), 500
-
-from flask_talisman import Talisman
-
-csp = {
-    'default-src': ["'self'"],
-    'script-src': [
-        "'self'", "'unsafe-inline'", "'unsafe-eval'",
-        'https://js.stripe.com',
-        'https://custom-nails-backend.example.com',  # Replace with your backend domain
-        'https://nail-shop.example.com'  # Replace with your frontend domain
-    ],
-    'connect-src': [
-        "'self'",
-        'https://api.stripe.com',
-        'https://custom-nails-backend.example.com',  # Replace with your backend domain
-        'https://nail-shop.example.com'  # Replace with your frontend domain
-    ],
-    'frame-src': [
-        'https://js.stripe.com',
-        'https://custom-nails-backend.example.com',  # Replace with your backend domain
-        'https://nail-shop.example.com'  # Replace with your frontend domain
-    ],
-    'img-src': [
-        "'self'", 'data:', 'https://*.stripe.com',
-        'https://custom-nails-backend.example.com',  # Replace with your backend domain
-        'https://nail-shop.example.com'  # Replace with your frontend domain
-    ],
-    'style-src': [
-        "'self'", "'unsafe-inline'",
-        'https://custom-nails-backend.example.com',  # Replace with your backend domain
-        'https://nail-shop.example.com'  # Replace with your frontend domain
-    ]
-}
-
-# Initialize Talisman with the CSP configuration
-Talisman(app, content_security_policy=csp)
-
-@app.errorhandler(500)
-def internal_error(error):
-    app.logger.error(f'Internal Server Error: {error}')
-    return jsonify({'error': 'Internal Server Error', 'message': str(error)}), 500
-
-@app.route('/')
-def index():
-    response = make_response("Setting a cookie")
-    response.set_cookie(
-        'my_cookie', 
-        'cookie_value', 
-        secure=True, 
-        httponly=True, 
-        samesite='None'  # Use 'Lax' or 'Strict' if possible
-    )
-    return response
-
-
-
-
-mail = Mail(app)
-jwt = JWTManager(app)
-from flask_migrate import Migrate
-
-migrate = Migrate(app, db)
-
-CORS(app, resources={r"/*": {"origins": ["https://localhost:3000", "https://nail-shop.onrender.com"]}})
-
-CORS(app, resources={r"/*": {"origins": "*"}}, methods=["OPTIONS", "GET", "POST", "PUT", "DELETE"], supports_credentials=True)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-print(f"Database URL: {app.config['SQLALCHEMY_DATABASE_URI']}")
-
-# Set up logging
-if not app.debug:
-    handler = RotatingFileHandler('error.log', maxBytes=10000, backupCount=1)
-    handler.setLevel(logging.INFO)
-    app.logger.addHandler(handler)
-else:
-    logging.basicConfig(level=logging.DEBUG)
-
-# Ensure a secret key is set for session management
-app.secret_key = os.getenv('FLASK_SECRET_KEY', 'supersecretkey')
-
-from app.order.routes import order_blueprint
-from app.user.routes import user_blueprint
-from app.product.routes import product_blueprint
-from app.cart.routes import cart_blueprint
-
-
-app.register_blueprint(user_blueprint, url_prefix='/user')
-app.register_blueprint(product_blueprint, url_prefix='/product')
-app.register_blueprint(order_blueprint, url_prefix='/order')
-app.register_blueprint(cart_blueprint, url_prefix='/cart')
-
-# Flask-Session setup
-app.config['SESSION_TYPE'] = 'filesystem'
-app.config['SESSION_PERMANENT'] = False
-app.config['SESSION_USE_SIGNER'] = True
-app.config['SESSION_KEY_PREFIX'] = 'flask-session:'
-app.config['SESSION_FILE_DIR'] = '/tmp/flask-session/'
-
-# Create session directory if it does not exist
-if not os.path.exists(app.config['SESSION_FILE_DIR']):
-    os.makedirs(app.config['SESSION_FILE_DIR'])
-    print(f"Created session directory: {app.config['SESSION_FILE_DIR']}")
-else:
-    print(f"Session directory exists: {app.config['SESSION_FILE_DIR']}")
-
-Session(app)
-
-cache = Cache(config={'CACHE_TYPE': 'simple'})
-cache.init_app(app)
-
-db.init_app(app)
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.send']
-CLIENT_SECRETS_FILE = os.path.join(os.path.dirname(__file__), 'config', 'client_secrets.json')
-print(f"CLIENT_SECRETS_FILE path: {CLIENT_SECRETS_FILE}")
-
-if not os.path.exists(CLIENT_SECRETS_FILE):
-    raise FileNotFoundError(f"Client secrets file not found at path: {CLIENT_SECRETS_FILE}")
-
-@app.route('/create-checkout-session', methods=['POST'])
-@jwt_required()
-def create_checkout_session():
-    try:
-        app.logger.info('Received request to create checkout session.')
-        data = request.get_json()
-        app.logger.info(f'Request data: {data}')
-        
-        order_id = data.get('order_id')
-        if not order_id:
-            app.logger.error('Missing order_id in request body.')
-            return jsonify({'error': 'Missing order_id in request body'}), 400
-
-        # Check if the checkout session is already cached
-        cache_key = f'checkout_session_{order_id}'
-        cached_session = cache.get(cache_key)
-        if cached_session:
-            app.logger.info(f'Found cached session for order_id {order_id}.')
-            return jsonify({'url': cached_session.url})
-
-        # Fetch order details from your database
-        order = Order.query.get(order_id)
-        if not order:
-            app.logger.error(f'Order not found for order_id {order_id}.')
-            return jsonify({'error': 'Order not found'}), 404
-
-        app.logger.info(f'Creating Stripe checkout session for order_id {order_id}.')
-        # Create a new Stripe Checkout Session
-        session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[
-                {
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': f'Order {order_id}',
-                        },
-                        'unit_amount': int(order.total_amount * 100),  # Convert to cents
-                    },
-                    'quantity': 1,
-                },
-            ],
-            mode='payment',
-            success_url=f"https://nail-shop.onrender.com/ordersuccesspage/{order_id}",
-            cancel_url=f"https://nail-shop.onrender.com/cancel",
-            metadata={
-                'order_id': order_id
-            }
-        )
-
-        # Cache the checkout session
-        cache.set(cache_key, session, timeout=3600)  # Cache for 1 hour
-        app.logger.info(f'Checkout session created and cached for order_id {order_id}.')
-
-        return jsonify({
-            'sessionId': session.id,
-            'publishableKey': app.config['STRIPE_PUBLISHABLE_KEY']
-        }), 200
-
-    except Exception as e:
-        app.logger.error(f'Error creating checkout session: {e}', exc_info=True)
-        return jsonify({'error': 'Failed to create checkout session', 'message': str(e)}), 500
-
-print(f"Stripe Secret Key: {app.config['STRIPE_SECRET_KEY']}")
-
-@app.after_request
-def set_csp_header(response):
-    csp = (
-        "default-src 'self'; "
-        "connect-src *; "  # Allow all connections for debugging
-        "frame-src 'self' https://js.stripe.com https://hooks.stripe.com https://connect-js.stripe.com https://checkout.stripe.com; "
-        "script-src 'self' 'unsafe-inline' https://js.stripe.com https://maps.googleapis.com https://connect-js.stripe.com https://checkout.stripe.com; "
-        "style-src 'self' 'unsafe-inline' sha256-0hAheEzaMe6uXIKV4EehS9pu1am1lj/KnnzrOYqckXk=; "
-        "img-src 'self' data: https://*.stripe.com; "
-        "report-uri /csp-report;"
-    )
-    print("Setting CSP header:", csp)
-    response.headers['Content-Security-Policy'] = csp
-    return response
-
-@app.route('/authorize')
-def authorize():
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=url_for('oauth2_callback', _external=True)
-    )
-    authorization_url, state = flow.authorization_url(
-        access_type='offline',
-        include_granted_scopes='true'
-    )
-    session['state'] = state
-    print(f"State set in session: {state}")
-    return redirect(authorization_url)
-
-@app.route('/oauth2/callback')
-def oauth2_callback():
-    state = session.get('state')
-    if not state:
-        return jsonify({'error': 'State not found in session'}), 400
-
-    print(f"State retrieved from session: {state}")
-
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        state=state,
-        redirect_uri=url_for('oauth2_callback', _external=True)
-    )
-    flow.fetch_token(authorization_response=request.url)
-    credentials = flow.credentials
-
-    session['credentials'] = credentials_to_dict(credentials)
-    print("Credentials stored in session:", session['credentials'])
-    return redirect(url_for('send_email'))
-
-def credentials_to_dict(credentials):
-    return {
-        'token': credentials.token,
-        'refresh_token': credentials.refresh_token,
-        'token_uri': credentials.token_uri,
-        'client_id': credentials.client_id,
-        'client_secret': credentials.client_secret,
-        'scopes': credentials.scopes
-    }
-
-def get_gmail_service():
-    try:
-        from google.oauth2 import service_account
-        credentials = service_account.Credentials.from_service_account_file('app/config/nail-shop.json')
-        return build('gmail', 'v1', credentials=credentials)
-    except ValueError as e:
-        app.logger.error(f"ValueError: {str(e)}")
-        return None
-    except Exception as e:
-        app.logger.error(f"Exception in get_gmail_service: {str(e)}")
-        return None
-
-@app.route('/send-emails', methods=['POST'])
-@jwt_required()
-def send_emails():
-    current_user = get_current_user()
-    
-    if not current_user:
-        return jsonify({'message': 'User not found'}), 404
-
-    if not request.is_json:
-        return jsonify({'message': 'Request payload must be in JSON format'}), 400
-
-    data = request.get_json()
-    user_id = data.get('user_id')
-    order_id = data.get('order_id')
-
-    # Fetch user details
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    # Fetch order details
-    order = Order.query.get(order_id)
-    if not order or order.user_id != user_id:
-        return jsonify({'message': 'Order not found or does not belong to the user'}), 404
-
-    # Fetch order items
-    order_items = OrderItem.query.filter_by(order_id=order_id).all()
-
-    # Developer email from environment variables
-    developer_email = os.environ.get('DEVELOPER_EMAIL')
-    if not developer_email:
-        return jsonify({'message': 'Developer email not configured'}), 500
-
-    # Render the email templates
-    user_email_body = render_template(
-        'customer_email.html',
-        customer_name=user.email,
-        order=order,
-        order_items=order_items,
-        total_amount=order.total_amount
-    )
-    developer_email_body = render_template(
-        'developer_email.html',
-        customer_name=user.email,
-        order=order,
-        order_items=order_items,
-        total_amount=order.total_amount
-    )
-
-    # Send email to customer
-    customer_msg = Message(
-        'Order Confirmation',
-        recipients=[user.email],
-        html=user_email_body
-    )
-    mail.send(customer_msg)
-
-    # Send email to developer
-    developer_msg = Message(
-        'New Order Received',
-        recipients=[developer_email],
-        html=developer_email_body
-    )
-    mail.send(developer_msg)
-
-    return jsonify({'message': 'Emails sent successfully'}), 200
-
-def get_current_user():
-    user_id = get_jwt_identity()
-    return User.query.get(user_id)
-
-from email.message import EmailMessage
-
-def send_message(service, user_id, message):
-    try:
-        message = service.users().messages().send(userId='me', body=message).execute()
-        print('Message Id: %s' % message['id'])
-        return message
-    except Exception as error:
-        print('An error occurred: %s' % error)
-        raise
-
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-print(f"JWT Secret Key: {app.config['JWT_SECRET_KEY']}")
-
-@app.route('/debug-token', methods=['GET'])
-@jwt_required()
-def debug_token():
-    current_user_id = get_jwt_identity()
-    return jsonify({"current_user_id": current_user_id}), 200
-
-if __name__ == '__main__':
-    port = int(os.getenv('PORT', 1000))
-    app.run(host='0.0.0.0', port=port)
-
-
-
-
-
-
-
-
-
-
-
-
 
 
+def create_app(config=None):
+    """Build a configured application.
+
+    ``config`` may be a config object, an import string such as
+    ``'config.Config'`` or a mapping of settings that override
+    ``config.Config``. When omitted the ``APP_SETTINGS`` environment
+    variable is used, falling back to ``config.Config``.
+
+    Heavy integrations (Stripe, Google APIs, Flask-Mail) are not imported
+    here; the routes that need them load them on first use.
+    """
+    app = Flask(__name__, template_folder='templates', static_url_path='/nails', static_folder='nails')
+
+    # Additional configuration for hosted environment
+    app.config['ENV'] = 'production'
+    app.config['DEBUG'] = False
+
+    if config is None:
+        config = os.getenv('APP_SETTINGS') or 'config.Config'
+    if isinstance(config, Mapping):
+        from config import Config, engine_options, async_engine_options
+        app.config.from_object(Config)
+        app.config.from_mapping(config)
+        # Engine options depend on the database URL, so follow an override.
+        if 'SQLALCHEMY_DATABASE_URI' in config:
+            url = config['SQLALCHEMY_DATABASE_URI']
+            if 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+                app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+            if 'SQLALCHEMY_ASYNC_ENGINE_OPTIONS' not in config:
+                app.config['SQLALCHEMY_ASYNC_ENGINE_OPTIONS'] = async_engine_options(url)
+    else:
+        app.config.from_object(config)
+
+    # Ensure a secret key is set for session management
+    app.secret_key = app.config.get('FLASK_SECRET_KEY') or 'supersecretkey'
+
+    request_logging.init_app(app)
+    # Registered early so its after_request hook runs last, on the final body.
+    compression.init_app(app)
+
+    db.init_app(app)
+    jwt.init_app(app)
+    migrate.init_app(app, db)
+    cache.init_app(app)
+    db_routing.init_app(app)
+    metrics.init_app(app)
+    slow_queries.init_app(app)
+    profiling.init_app(app)
+    seed.init_app(app)
+    search.init_app(app)
+    typeahead.init_app(app)
+    size_options.init_app(app)
+    product_import.init_app(app)
+    analytics.init_app(app)
+    order_export.init_app(app)
+    cart_store.init_app(app)
+    idempotency.init_app(app)
+
+    session_store.init_app(app)
+
+    register_blueprints(app)
+    headers.init_app(app)
+    return app
+
+
+def register_blueprints(app):
+    from app.main.routes import main_blueprint
+    from app.checkout.routes import checkout_blueprint
+    from app.checkout.async_routes import async_checkout_blueprint
+    from app.notifications.routes import notifications_blueprint
+    from app.order.routes import order_blueprint
+    from app.user.routes import user_blueprint
+    from app.product.routes import product_blueprint
+    from app.cart.routes import cart_blueprint
+    from app.admin.routes import admin_blueprint
+    from app.nail_sizes.routes import nail_sizes_blueprint
+
+    app.register_blueprint(main_blueprint)
+    app.register_blueprint(checkout_blueprint)
+    app.register_blueprint(async_checkout_blueprint, url_prefix='/async')
+    app.register_blueprint(notifications_blueprint)
+    app.register_blueprint(user_blueprint, url_prefix='/user')
+    app.register_blueprint(product_blueprint, url_prefix='/product')
+    app.register_blueprint(order_blueprint, url_prefix='/order')
+    app.register_blueprint(cart_blueprint, url_prefix='/cart')
+    app.register_blueprint(admin_blueprint, url_prefix='/admin')
+    app.register_blueprint(nail_sizes_blueprint, url_prefix='/nail_sizes')
@@ -0,0 +1,148 @@
+from datetime import date
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy import func, select
+from app.analytics import parse_range
+from app.auth import admin_required
+from app.order_export import FORMATS, export_chunks, export_query
+from app.models import db, Product, NailSizeOption, DailyProductSales, DailySizeSales
+
+admin_blueprint = Blueprint("admin", __name__, url_prefix="/admin")
+
+# Reports read only the daily rollup tables (app/analytics.py), plus product
+# and size names for the rows returned.
+SORTS = ('revenue', 'units', 'orders')
+
+
+def _range():
+    return parse_range(request.args.get('start'), request.args.get('end'))
+
+
+def _totals(model):
+    return (
+        func.round(func.sum(model.revenue), 2).label('revenue'),
+        func.sum(model.units).label('units'),
+        func.sum(model.orders).label('orders'),
+    )
+
+
+@admin_blueprint.route('/reports/products', methods=['GET'])
+@admin_required
+def product_report():
+    try:
+        start, end = _range()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date range: {e}'}), 400
+    sort = request.args.get('sort', 'revenue')
+    if sort not in SORTS:
+        return jsonify({'error': f'sort must be one of {", ".join(SORTS)}'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 500)
+
+    totals = (
+        select(DailyProductSales.product_id, *_totals(DailyProductSales))
+        .where(DailyProductSales.day.between(start, end))
+        .group_by(DailyProductSales.product_id)
+        .order_by(func.sum(getattr(DailyProductSales, sort)).desc(), DailyProductSales.product_id)
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(totals, Product.name)
+        .outerjoin(Product, Product.product_id == totals.c.product_id)
+        .order_by(totals.c[sort].desc(), totals.c.product_id)
+    ).all()
+    return jsonify({
+        'success': True,
+        'range': {'start': start.isoformat(), 'end': end.isoformat()},
+        'data': [
+            {'product_id': row.product_id, 'name': row.name, 'revenue': row.revenue,
+             'units': row.units, 'orders': row.orders}
+            for row in rows
+        ],
+    })
+
+
+@admin_blueprint.route('/reports/sizes', methods=['GET'])
+@admin_required
+def size_report():
+    try:
+        start, end = _range()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date range: {e}'}), 400
+
+    totals = (
+        select(DailySizeSales.nail_size_option_id, *_totals(DailySizeSales))
+        .where(DailySizeSales.day.between(start, end))
+        .group_by(DailySizeSales.nail_size_option_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(totals, NailSizeOption.name)
+        .outerjoin(NailSizeOption, NailSizeOption.nail_size_option_id == totals.c.nail_size_option_id)
+        .order_by(totals.c.revenue.desc(), totals.c.nail_size_option_id)
+    ).all()
+    return jsonify({
+        'success': True,
+        'range': {'start': start.isoformat(), 'end': end.isoformat()},
+        'data': [
+            {'nail_size_option_id': row.nail_size_option_id, 'name': row.name, 'revenue': row.revenue,
+             'units': row.units, 'orders': row.orders}
+            for row in rows
+        ],
+    })
+
+
+@admin_blueprint.route('/reports/daily', methods=['GET'])
+@admin_required
+def daily_report():
+    try:
+        start, end = _range()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date range: {e}'}), 400
+    product_id = request.args.get('product_id', type=int)
+    size_option_id = request.args.get('nail_size_option_id', type=int)
+    # Order counts only add up within one product or size; an order with
+    # several products is one order in each of their rows.
+    if (product_id is None) == (size_option_id is None):
+        return jsonify({'error': 'Pass exactly one of product_id or nail_size_option_id'}), 400
+
+    if product_id is not None:
+        model, condition = DailyProductSales, DailyProductSales.product_id == product_id
+    else:
+        model, condition = DailySizeSales, DailySizeSales.nail_size_option_id == size_option_id
+    rows = db.session.execute(
+        select(model.day, model.revenue, model.units, model.orders)
+        .where(condition, model.day.between(start, end))
+        .order_by(model.day)
+    ).all()
+    return jsonify({
+        'success': True,
+        'range': {'start': start.isoformat(), 'end': end.isoformat()},
+        'data': [
+            {'day': row.day.isoformat(), 'revenue': row.revenue, 'units': row.units, 'orders': row.orders}
+            for row in rows
+        ],
+    })
+
+
+@admin_blueprint.route('/orders/export', methods=['GET'])
+@admin_required
+def export_orders():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(FORMATS)}'}), 400
+    try:
+        start, end = (date.fromisoformat(request.args[key]) if request.args.get(key) else None
+                      for key in ('start', 'end'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date: {e}'}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    # The body is generated while it is sent, from a server-side cursor.
+    query = export_query(start, end, request.args.get('status'))
+    filename = f'orders-{start or "all"}-{end or date.today()}.{fmt}' + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(export_chunks(query, fmt, compress)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,127 @@
+from datetime import date
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db, Order, OrderItem, DailyProductSales, DailySizeSales
+
+analytics_cli = AppGroup('analytics', help='Maintain the sales rollup tables.')
+
+# Orders in these states have been paid and are counted in the rollups.
+PAID_STATUSES = ('Paid', 'Shipped')
+ROLLUPS = ((DailyProductSales, 'product_id'), (DailySizeSales, 'nail_size_option_id'))
+MEASURES = ('revenue', 'units', 'orders')
+
+
+def _insert(model):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    raise RuntimeError(f'Sales rollups are not supported on {dialect}')
+
+
+def record_paid_order(order_id):
+    """Mark an order paid and add it to the daily rollups.
+
+    Runs in the caller's transaction, which must be committed. The status
+    change is conditional, so a repeated payment notification for the same
+    order is counted once. Returns False when the order does not exist or
+    was already paid.
+    """
+    result = db.session.execute(
+        update(Order)
+        .where(Order.order_id == order_id, Order.status.not_in(PAID_STATUSES))
+        .values(status='Paid')
+    )
+    if result.rowcount != 1:
+        return False
+
+    created_at = db.session.scalar(select(Order.created_at).where(Order.order_id == order_id))
+    items = db.session.execute(
+        select(OrderItem.product_id, OrderItem.nail_size_option_id, OrderItem.quantity, OrderItem.unit_price)
+        .where(OrderItem.order_id == order_id)
+    ).all()
+    day = created_at.date()
+
+    for model, key in ROLLUPS:
+        totals = {}
+        for item in items:
+            revenue, units = totals.get(getattr(item, key), (0.0, 0))
+            totals[getattr(item, key)] = (revenue + item.quantity * item.unit_price, units + item.quantity)
+        if not totals:
+            continue
+        statement = _insert(model)
+        # Concurrent payments on the same day add to the row atomically.
+        statement = statement.on_conflict_do_update(
+            index_elements=['day', key],
+            set_={measure: model.__table__.c[measure] + statement.excluded[measure] for measure in MEASURES},
+        )
+        db.session.execute(statement, [
+            {'day': day, key: value, 'revenue': round(revenue, 2), 'units': units, 'orders': 1}
+            for value, (revenue, units) in totals.items()
+        ])
+    return True
+
+
+def rebuild(start=None, end=None):
+    """Recompute the rollups from the order tables, for the whole history or
+    the days from ``start`` to ``end`` inclusive. Returns rows written per
+    table."""
+    day = func.date(Order.created_at, type_=db.Date)
+    written = {}
+    for model, key in ROLLUPS:
+        source = (
+            select(
+                day,
+                getattr(OrderItem, key),
+                func.round(func.sum(OrderItem.quantity * OrderItem.unit_price), 2),
+                func.sum(OrderItem.quantity),
+                func.count(func.distinct(OrderItem.order_id)),
+            )
+            .join(Order, Order.order_id == OrderItem.order_id)
+            .where(Order.status.in_(PAID_STATUSES))
+            .group_by(day, getattr(OrderItem, key))
+        )
+        clear = delete(model)
+        if start:
+            source, clear = source.where(day >= start), clear.where(model.day >= start)
+        if end:
+            source, clear = source.where(day <= end), clear.where(model.day <= end)
+        db.session.execute(clear)
+        result = db.session.execute(
+            model.__table__.insert().from_select(['day', key] + list(MEASURES), source)
+        )
+        written[model.__tablename__] = result.rowcount
+    db.session.commit()
+    return written
+
+
+@analytics_cli.command('rebuild')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day to rebuild.')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last day to rebuild.')
+@with_appcontext
+def rebuild_command(start, end):
+    """Recompute the daily sales rollups from orders.
+
+    Use after backfills or manual status changes; paid orders are otherwise
+    added as their payment is confirmed.
+    """
+    written = rebuild(start.date() if start else None, end.date() if end else None)
+    for table, count in written.items():
+        click.echo(f'{table:<20} {count:>8} rows')
+
+
+def parse_range(start, end, default_days=30):
+    """The ``(start, end)`` dates of a report; ``end`` defaults to today and
+    ``start`` to ``default_days`` before it. Raises ValueError."""
+    end = date.fromisoformat(end) if end else date.today()
+    start = date.fromisoformat(start) if start else date.fromordinal(end.toordinal() - default_days + 1)
+    if start > end:
+        raise ValueError('start must not be after end')
+    return start, end
+
+
+def init_app(app):
+    app.cli.add_command(analytics_cli)
@@ -0,0 +1,74 @@
+from email.message import EmailMessage
+from flask import current_app
+from app.metrics import track_outbound
+
+STRIPE_API_BASE = 'https://api.stripe.com'
+
+
+class StripeError(Exception):
+    pass
+
+
+def stripe_form(params, prefix=''):
+    """Flatten nested params into Stripe's form encoding
+    (``line_items[0][price_data][currency]=usd``)."""
+    fields = {}
+    items = params.items() if isinstance(params, dict) else enumerate(params)
+    for key, value in items:
+        name = f'{prefix}[{key}]' if prefix else str(key)
+        if isinstance(value, (dict, list, tuple)):
+            fields.update(stripe_form(value, name))
+        elif isinstance(value, bool):
+            fields[name] = 'true' if value else 'false'
+        elif value is not None:
+            fields[name] = str(value)
+    return fields
+
+
+async def create_stripe_checkout_session(params):
+    """Create a Checkout Session without blocking the event loop.
+
+    The installed ``stripe`` library only has a blocking client, so this
+    talks to the REST API directly with httpx.
+    """
+    import httpx
+
+    config = current_app.config
+    async with httpx.AsyncClient(base_url=config.get('STRIPE_API_BASE') or STRIPE_API_BASE, timeout=30) as client:
+        with track_outbound('stripe', 'checkout.session.create'):
+            response = await client.post(
+                '/v1/checkout/sessions',
+                data=stripe_form(params),
+                auth=(config['STRIPE_SECRET_KEY'], ''),
+            )
+    body = response.json()
+    if response.is_error:
+        raise StripeError(body.get('error', {}).get('message', f'Stripe returned HTTP {response.status_code}'))
+    return body
+
+
+async def send_mail(subject, recipients, html):
+    """Send an HTML email over SMTP using the Flask-Mail settings."""
+    config = current_app.config
+    if config.get('MAIL_SUPPRESS_SEND', current_app.testing):
+        return
+
+    import aiosmtplib
+
+    message = EmailMessage()
+    message['From'] = config['MAIL_DEFAULT_SENDER']
+    message['To'] = ', '.join(recipients)
+    message['Subject'] = subject
+    message.set_content(html, subtype='html')
+
+    with track_outbound('smtp', 'send'):
+        await aiosmtplib.send(
+            message,
+            hostname=config['MAIL_SERVER'],
+            port=config['MAIL_PORT'],
+            start_tls=config.get('MAIL_USE_TLS', False),
+            use_tls=config.get('MAIL_USE_SSL', False),
+            username=config.get('MAIL_USERNAME'),
+            password=config.get('MAIL_PASSWORD'),
+            timeout=30,
+        )
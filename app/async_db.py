@@ -0,0 +1,37 @@
+from flask import current_app
+from sqlalchemy.engine import make_url
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for database backend {backend!r}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def async_session():
+    """Open an ``AsyncSession`` on the app's database.
+
+    Use it as ``async with async_session() as session:``. The engine is
+    created on first use so sync-only workers never import the async
+    drivers.
+    """
+    factory = current_app.extensions.get('async_sessionmaker')
+    if factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        engine = create_async_engine(
+            async_database_url(current_app.config['SQLALCHEMY_DATABASE_URI']),
+            **current_app.config.get('SQLALCHEMY_ASYNC_ENGINE_OPTIONS', {})
+        )
+        if current_app.config.get('METRICS_ENABLED'):
+            from app.metrics import instrument_engine
+            instrument_engine(engine.sync_engine)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        current_app.extensions['async_sessionmaker'] = factory
+    return factory()
@@ -0,0 +1,18 @@
+from functools import wraps
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+
+def is_admin(user_id):
+    return str(user_id) in current_app.config['ADMIN_USER_IDS']
+
+
+def admin_required(view):
+    """Like ``jwt_required()``, but only for the users in ADMIN_USER_IDS."""
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not is_admin(get_jwt_identity()):
+            return jsonify({'message': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
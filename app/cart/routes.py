@@ -1,5 +1,9 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+from app import cart_store, size_options
+from app.idempotency import idempotent
 from app.models import db, Product, Cart, CartItem, NailSizeOption
 from flask import Blueprint
 
@@ -8,6 +12,7 @@ cart_blueprint = Blueprint("cart", __name__, url_prefix="/cart")
 
 @cart_blueprint.route('/add_to_cart', methods=['POST'])
 @jwt_required()
+@idempotent
 def add_to_cart():
     data = request.json
     user_id = get_jwt_identity()
@@ -19,6 +24,17 @@ def add_to_cart():
 
     if not product_id or not quantity or not nail_size_option_id:
         return jsonify({'error': 'Product ID, quantity, and nail size option are required'}), 400
+    try:
+        nail_size_option_id = int(nail_size_option_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Nail size option must be an id'}), 400
+
+    if size_options.get(nail_size_option_id) is None:
+        return jsonify({'error': 'Nail size option not found'}), 404
+
+    if cart_store.get_store() is not None:
+        return add_to_stored_cart(user_id, product_id, quantity, nail_size_option_id,
+                                  left_hand_custom_size, right_hand_custom_size)
 
     user_cart = Cart.query.filter_by(user_id=user_id).first()
     if not user_cart:
@@ -53,10 +69,63 @@ def add_to_cart():
 
     return jsonify({'message': 'Product added to cart successfully'})
 
+
+def add_to_stored_cart(user_id, product_id, quantity, nail_size_option_id,
+                       left_hand_custom_size, right_hand_custom_size):
+    # Reserve the stock in one statement; the cart itself is written later
+    # by the cart store's flusher.
+    product = db.session.execute(
+        update(Product)
+        .where(Product.product_id == product_id, Product.quantity_available >= quantity)
+        .values(quantity_available=Product.quantity_available - quantity)
+        .returning(Product.name, Product.image_url, Product.price)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if product is None:
+        db.session.rollback()
+        if db.session.get(Product, product_id) is None:
+            return jsonify({'error': 'Product not found'}), 404
+        return jsonify({'error': 'Not enough quantity available'}), 400
+    db.session.commit()
+
+    def add(cart):
+        for item in cart['items']:
+            if item['product_id'] == product_id:
+                item['quantity'] += quantity
+                return
+        cart['items'].append({
+            'product_id': product_id,
+            'quantity': quantity,
+            'unit_price': product.price,
+            'nail_size_option_id': nail_size_option_id,
+            'left_hand_custom_size': left_hand_custom_size,
+            'right_hand_custom_size': right_hand_custom_size,
+            'name': product.name,
+            'image': product.image_url,
+            'price': product.price,
+        })
+
+    try:
+        cart_store.update(user_id, add, create=True)
+    except Exception:
+        # Give the reserved stock back; the item never reached the cart.
+        db.session.rollback()
+        db.session.execute(
+            update(Product)
+            .where(Product.product_id == product_id)
+            .values(quantity_available=Product.quantity_available + quantity)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        current_app.logger.exception(f'Adding product {product_id} to the stored cart of user {user_id} failed')
+        return jsonify({'error': 'Cart temporarily unavailable'}), 503
+    return jsonify({'message': 'Product added to cart successfully'})
+
 @cart_blueprint.route('/update', methods=['PUT'])
 @jwt_required()
 def update_cart():
     user_id = get_jwt_identity()
+    cart_store.persist(user_id)
     cart = Cart.query.filter_by(user_id=user_id).first()
     if not cart:
         return jsonify({'error': 'Cart not found'}), 404
@@ -76,6 +145,7 @@ def update_cart():
         cart.total_amount = total_amount
 
     db.session.commit()
+    cart_store.invalidate(user_id)
     return jsonify({'message': 'Cart updated successfully', 'cart': cart.to_response()})
 
 
@@ -83,13 +153,16 @@ def update_cart():
 @jwt_required()
 def delete_all_items_in_cart():
     user_id = get_jwt_identity()
+    if cart_store.get_store() is not None:
+        if cart_store.update(user_id, lambda cart: cart['items'].clear()) is None:
+            return jsonify({'error': 'Cart not found'}), 404
+        return jsonify({'message': 'All items in cart deleted successfully'}), 200
+
     cart = Cart.query.filter_by(user_id=user_id).first()
     if not cart:
         return jsonify({'error': 'Cart not found'}), 404
     try:
-        cart_items = CartItem.query.filter_by(cart_id=cart.cart_id).all()
-        for cart_item in cart_items:
-            db.session.delete(cart_item)
+        CartItem.query.filter_by(cart_id=cart.cart_id).delete(synchronize_session=False)
         db.session.commit()
         return jsonify({'message': 'All items in cart deleted successfully'}), 200
     except Exception as e:
@@ -97,17 +170,13 @@ def delete_all_items_in_cart():
     
 
 
-@cart_blueprint.route('/delete_item/<int:item_id>', methods=['DELETE', 'OPTIONS'])
+@cart_blueprint.route('/delete_item/<int:item_id>', methods=['DELETE'])
 @jwt_required()
 def delete_item_from_cart(item_id):
-    if request.method == 'OPTIONS':
-        response = make_response()
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        response.headers['Access-Control-Allow-Methods'] = 'DELETE'
-        return response
-
     user_id = get_jwt_identity()
+    if cart_store.get_store() is not None:
+        return delete_stored_item(user_id, item_id)
+
     cart = Cart.query.filter_by(user_id=user_id).first()
     if not cart:
         return jsonify({'error': 'Cart not found'}), 404
@@ -139,12 +208,28 @@ def delete_item_from_cart(item_id):
         return jsonify({'error': str(e)}), 500
 
 
+def delete_stored_item(user_id, product_id):
+    def remove(cart):
+        cart['items'] = [item for item in cart['items'] if item['product_id'] != product_id]
+
+    cart = cart_store.get_state(user_id)
+    if cart is None:
+        return jsonify({'error': 'Cart not found'}), 404
+    if not any(item['product_id'] == product_id for item in cart['items']):
+        return jsonify({'error': 'Cart item not found'}), 404
+    cart = cart_store.update(user_id, remove)
+    total_price = cart_store.to_response(cart)['total_price']
+    return jsonify({'message': 'Cart item deleted successfully', 'new_total_amount': total_price}), 200
+
+
 
 
 @cart_blueprint.route('/add_quantity/<int:item_id>', methods=['PUT'])
 @jwt_required()
 def add_quantity_to_cart(item_id):
     user_id = get_jwt_identity()
+    # Addresses cart_item rows by id, so the stored cart must be written first.
+    cart_store.persist(user_id)
     cart = Cart.query.filter_by(user_id=user_id).first()
     if not cart:
         return jsonify({'error': 'Cart not found'}), 404
@@ -172,6 +257,7 @@ def add_quantity_to_cart(item_id):
         cart_item.quantity += quantity
 
         db.session.commit()
+        cart_store.invalidate(user_id)
 
         return jsonify({'message': 'Quantity added to cart successfully', 'new_total_amount': cart.total_amount}), 200
     except Exception as e:
@@ -184,25 +270,37 @@ def add_quantity_to_cart(item_id):
 @jwt_required()
 def get_cart():
     user_id = get_jwt_identity()
+    if cart_store.get_store() is not None:
+        cart = cart_store.get_state(user_id)
+        if cart is None:
+            return jsonify({'error': 'Cart not found'}), 404
+        return jsonify(cart_store.to_response(cart))
+
     cart = Cart.query.filter_by(user_id=user_id).first()
 
     if not cart:
         return jsonify({'error': 'Cart not found'}), 404
 
-    cart_items = CartItem.query.filter_by(cart_id=cart.cart_id).all()
-    cart_data = {'cart_id': cart.cart_id, 'items': []}
+    return jsonify(cart_response(cart.cart_id))
+
+
+def cart_response(cart_id):
+    """The /cart/read body of the cart with ``cart_id``."""
+    # Load each item's product in the same query; size names come from the
+    # in-process size option table
+    cart_items = CartItem.query.filter_by(cart_id=cart_id).options(joinedload(CartItem.product)).all()
+    cart_data = {'cart_id': cart_id, 'items': []}
     total_price = 0
 
     for cart_item in cart_items:
-        product = Product.query.get(cart_item.product_id)
-        nail_size_option = NailSizeOption.query.get(cart_item.nail_size_option_id)
+        product = cart_item.product
         item_data = {
             'product_id': product.product_id,
             'name': product.name,
             'image': product.image_url,
             'price': product.price,
             'quantity': cart_item.quantity,
-            'nail_size_option': nail_size_option.name,
+            'nail_size_option': size_options.name(cart_item.nail_size_option_id),
             'left_hand_custom_size': cart_item.left_hand_custom_size,
             'right_hand_custom_size': cart_item.right_hand_custom_size
         }
@@ -210,7 +308,6 @@ def get_cart():
         cart_data['items'].append(item_data)
 
     cart_data['total_price'] = total_price
-
-    return jsonify(cart_data)
+    return cart_data
 
 
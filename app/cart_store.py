@@ -0,0 +1,296 @@
+import atexit
+import json
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import select
+from app import size_options
+from app.models import db, Cart, CartItem, Product
+
+ITEM_FIELDS = ('quantity', 'unit_price', 'nail_size_option_id', 'left_hand_custom_size', 'right_hand_custom_size')
+
+
+class MemoryCartStore:
+    """Carts in this process only. For tests and single-process runs; with
+    several workers each would see its own carts."""
+
+    def __init__(self):
+        self.carts = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        data = self.carts.get(user_id)
+        return json.loads(data) if data else None
+
+    def put(self, user_id, state):
+        with self.lock:
+            self.carts.setdefault(user_id, json.dumps(state))
+
+    def update(self, user_id, change):
+        with self.lock:
+            state = json.loads(self.carts[user_id])
+            change(state)
+            state['version'] += 1
+            self.carts[user_id] = json.dumps(state)
+            self.dirty.add(user_id)
+            return state
+
+    def delete(self, user_id):
+        with self.lock:
+            self.carts.pop(user_id, None)
+
+    def claim_dirty(self, count):
+        with self.lock:
+            return [self.dirty.pop() for _ in range(min(count, len(self.dirty)))]
+
+    def mark_dirty(self, user_id):
+        with self.lock:
+            self.dirty.add(user_id)
+
+    def unmark_dirty(self, user_id):
+        with self.lock:
+            self.dirty.discard(user_id)
+
+
+class RedisCartStore:
+    """Carts in Redis, shared by every worker. Changes are applied in
+    WATCH/MULTI transactions; the set of carts awaiting persistence lives in
+    Redis too, so any worker's flusher can write them."""
+
+    def __init__(self, url, ttl, prefix='cart:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.dirty_key = prefix + 'dirty'
+
+    def get(self, user_id):
+        data = self.client.get(self.prefix + str(user_id))
+        return json.loads(data) if data else None
+
+    def put(self, user_id, state):
+        self.client.set(self.prefix + str(user_id), json.dumps(state), ex=self.ttl, nx=True)
+
+    def update(self, user_id, change):
+        key = self.prefix + str(user_id)
+
+        def apply(pipe):
+            data = pipe.get(key)
+            if data is None:
+                raise KeyError(user_id)
+            state = json.loads(data)
+            change(state)
+            state['version'] += 1
+            pipe.multi()
+            pipe.set(key, json.dumps(state), ex=self.ttl)
+            pipe.sadd(self.dirty_key, user_id)
+            return state
+
+        return self.client.transaction(apply, key, value_from_callable=True)
+
+    def delete(self, user_id):
+        self.client.delete(self.prefix + str(user_id))
+
+    def claim_dirty(self, count):
+        return [int(user_id) for user_id in self.client.spop(self.dirty_key, count) or []]
+
+    def mark_dirty(self, user_id):
+        self.client.sadd(self.dirty_key, user_id)
+
+    def unmark_dirty(self, user_id):
+        self.client.srem(self.dirty_key, user_id)
+
+
+def get_store():
+    """The configured store, or None when CART_STORE is not set."""
+    return current_app.extensions.get('cart_store')
+
+
+def _load(user_id, create=False):
+    """The cart state of ``user_id`` from the database, or None."""
+    cart = db.session.scalar(select(Cart).where(Cart.user_id == user_id))
+    if cart is None:
+        if not create:
+            return None
+        cart = Cart(user_id=user_id, total_amount=0)
+        db.session.add(cart)
+        db.session.commit()
+    rows = db.session.execute(
+        select(CartItem, Product.name, Product.image_url, Product.price)
+        .join(Product, Product.product_id == CartItem.product_id)
+        .where(CartItem.cart_id == cart.cart_id)
+        .order_by(CartItem.cart_item_id)
+    ).all()
+    items = [
+        dict({field: getattr(item, field) for field in ITEM_FIELDS},
+             product_id=item.product_id, name=name, image=image_url, price=price)
+        for item, name, image_url, price in rows
+    ]
+    return {'cart_id': cart.cart_id, 'version': 0, 'items': items}
+
+
+def get_state(user_id, create=False):
+    store = get_store()
+    state = store.get(user_id)
+    if state is None:
+        state = _load(user_id, create)
+        if state is not None:
+            store.put(user_id, state)
+            state = store.get(user_id) or state
+    return state
+
+
+def to_response(state):
+    """The /cart/read body for a stored cart."""
+    items = [
+        {
+            'product_id': item['product_id'],
+            'name': item['name'],
+            'image': item['image'],
+            'price': item['price'],
+            'quantity': item['quantity'],
+            'nail_size_option': size_options.name(item['nail_size_option_id']),
+            'left_hand_custom_size': item['left_hand_custom_size'],
+            'right_hand_custom_size': item['right_hand_custom_size'],
+        }
+        for item in state['items']
+    ]
+    total_price = sum(item['price'] * item['quantity'] for item in state['items'])
+    return {'cart_id': state['cart_id'], 'items': items, 'total_price': total_price}
+
+
+def update(user_id, change, create=False):
+    """Apply ``change(state)`` to the stored cart and queue it for writing.
+    Returns the new state, or None when the user has no cart."""
+    if get_state(user_id, create) is None:
+        return None
+    try:
+        return get_store().update(user_id, change)
+    except KeyError:
+        # Expired between the read and the update; reload and retry once.
+        get_state(user_id, create)
+        return get_store().update(user_id, change)
+
+
+def _write(state):
+    cart = db.session.scalar(select(Cart).where(Cart.cart_id == state['cart_id']).with_for_update())
+    if cart is None:
+        return
+    existing = {item.product_id: item for item in CartItem.query.filter_by(cart_id=cart.cart_id)}
+    wanted = {item['product_id']: item for item in state['items']}
+    for product_id, row in existing.items():
+        if product_id not in wanted:
+            db.session.delete(row)
+    for product_id, item in wanted.items():
+        row = existing.get(product_id)
+        if row is None:
+            db.session.add(CartItem(cart_id=cart.cart_id, product_id=product_id,
+                                    **{field: item[field] for field in ITEM_FIELDS}))
+        else:
+            for field in ITEM_FIELDS:
+                setattr(row, field, item[field])
+    cart.total_amount = round(sum(item['price'] * item['quantity'] for item in state['items']), 2)
+    db.session.commit()
+
+
+def persist(user_id):
+    """Write the user's stored cart to the database now. Call before code
+    that reads the cart tables, such as order creation."""
+    store = get_store()
+    if store is None:
+        return
+    state = store.get(user_id)
+    if state is None:
+        return
+    store.unmark_dirty(user_id)
+    try:
+        _write(state)
+    except Exception:
+        # Leave it to the flusher, as flush() does with failed writes.
+        db.session.rollback()
+        store.mark_dirty(user_id)
+        raise
+
+
+def invalidate(user_id):
+    """Drop the stored cart after the cart tables were changed directly."""
+    store = get_store()
+    if store is not None:
+        store.delete(user_id)
+
+
+def flush(store, batch_size=100):
+    """Write every cart changed since the last flush; a cart changed many
+    times in between is written once. Returns the number written."""
+    written = 0
+    requeue = []
+    while True:
+        user_ids = store.claim_dirty(batch_size)
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            state = store.get(user_id)
+            if state is None:
+                current_app.logger.warning(f'Cart of user {user_id} expired before it was written')
+                continue
+            try:
+                _write(state)
+            except Exception:
+                db.session.rollback()
+                requeue.append(user_id)
+                current_app.logger.exception(f'Writing the cart of user {user_id} failed; will retry')
+                continue
+            written += 1
+            latest = store.get(user_id)
+            if latest is not None and latest['version'] != state['version']:
+                requeue.append(user_id)
+    # Changed again while being written, or failed: next round.
+    for user_id in requeue:
+        store.mark_dirty(user_id)
+    return written
+
+
+def _start_flusher(app, store):
+    # One flusher thread per process, started on first use so that it also
+    # runs in forked workers.
+    interval = app.config['CART_FLUSH_INTERVAL']
+
+    def run_once():
+        with app.app_context():
+            flush(store)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                run_once()
+            except Exception:
+                app.logger.exception('Cart flusher failed')
+
+    threading.Thread(target=loop, name='cart-flusher', daemon=True).start()
+    atexit.register(run_once)
+
+
+def init_app(app):
+    """Serve carts from CART_STORE ('redis' or 'memory') and write them to
+    the cart tables in the background every CART_FLUSH_INTERVAL seconds."""
+    kind = app.config['CART_STORE']
+    if not kind:
+        return
+    if kind == 'redis':
+        store = RedisCartStore(app.config['CART_REDIS_URL'], app.config['CART_TTL'])
+    elif kind == 'memory':
+        store = MemoryCartStore()
+    else:
+        raise ValueError(f"CART_STORE must be 'redis' or 'memory', not {kind!r}")
+    app.extensions['cart_store'] = store
+    started_in = []
+
+    @app.before_request
+    def ensure_flusher():
+        if not started_in or started_in[-1] != os.getpid():
+            started_in.append(os.getpid())
+            _start_flusher(app, store)
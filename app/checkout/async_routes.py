@@ -0,0 +1,101 @@
+import asyncio
+import os
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.async_clients import create_stripe_checkout_session, send_mail
+from app.async_db import async_session
+from app.checkout.routes import checkout_session_params
+from app.extensions import cache
+from app.idempotency import idempotent
+from app.models import User, Order, OrderItem
+from app.notifications.routes import render_order_emails
+
+# Async variants of the checkout and notification flows. Database, Stripe and
+# SMTP calls are awaited, so independent calls within one request (the two
+# confirmation emails) run concurrently. Flask still runs each async view to
+# completion on a fresh event loop in the worker thread, so the thread is
+# held for the whole request and these routes add no extra concurrency per
+# worker. The async engine cannot pool across those loops (NullPool), so
+# every request also opens its own database connection.
+async_checkout_blueprint = Blueprint("async_checkout", __name__, url_prefix="/async")
+
+
+@async_checkout_blueprint.route('/create-checkout-session', methods=['POST'])
+@jwt_required()
+@idempotent
+async def create_checkout_session():
+    try:
+        data = request.get_json()
+        order_id = data.get('order_id')
+        if not order_id:
+            return jsonify({'error': 'Missing order_id in request body'}), 400
+
+        cache_key = f'checkout_session_{order_id}'
+        cached_session = cache.get(cache_key)
+        if cached_session:
+            return jsonify(cached_session), 200
+
+        async with async_session() as session:
+            order = await session.get(Order, order_id)
+        if not order:
+            return jsonify({'error': 'Order not found'}), 404
+
+        stripe_session = await create_stripe_checkout_session(checkout_session_params(order))
+        checkout_session = {
+            'sessionId': stripe_session['id'],
+            'url': stripe_session.get('url'),
+            'publishableKey': current_app.config['STRIPE_PUBLISHABLE_KEY']
+        }
+        cache.set(cache_key, checkout_session, timeout=3600)  # Cache for 1 hour
+        return jsonify(checkout_session), 200
+
+    except Exception as e:
+        current_app.logger.error(f'Error creating checkout session: {e}', exc_info=True)
+        return jsonify({'error': 'Failed to create checkout session', 'message': str(e)}), 500
+
+
+@async_checkout_blueprint.route('/send-emails', methods=['POST'])
+@jwt_required()
+async def send_emails():
+    if not request.is_json:
+        return jsonify({'message': 'Request payload must be in JSON format'}), 400
+
+    data = request.get_json()
+    user_id = data.get('user_id')
+    order_id = data.get('order_id')
+
+    developer_email = os.environ.get('DEVELOPER_EMAIL')
+    if not developer_email:
+        return jsonify({'message': 'Developer email not configured'}), 500
+
+    async with async_session() as session:
+        current_user = await session.get(User, get_jwt_identity())
+        if not current_user:
+            return jsonify({'message': 'User not found'}), 404
+
+        user = await session.get(User, user_id)
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+
+        # The templates walk order.user and each item's product, so load them
+        # up front; lazy loads are not possible on an AsyncSession.
+        order = await session.scalar(
+            select(Order)
+            .where(Order.order_id == order_id)
+            .options(
+                selectinload(Order.user),
+                selectinload(Order.order_items).selectinload(OrderItem.product),
+            )
+        )
+    if not order or order.user_id != user_id:
+        return jsonify({'message': 'Order not found or does not belong to the user'}), 404
+
+    user_email_body, developer_email_body = render_order_emails(user, order, order.order_items)
+    await asyncio.gather(
+        send_mail('Order Confirmation', [user.email], user_email_body),
+        send_mail('New Order Received', [developer_email], developer_email_body),
+    )
+
+    return jsonify({'message': 'Emails sent successfully'}), 200
@@ -0,0 +1,143 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from app import analytics, cart_store, size_options
+from app.cart.routes import cart_response
+from app.extensions import cache, get_stripe
+from app.idempotency import idempotent
+from app.metrics import track_outbound
+from app.models import db, Cart, Order, User
+
+checkout_blueprint = Blueprint("checkout", __name__)
+
+
+def checkout_session_params(order):
+    order_id = order.order_id
+    return dict(
+        payment_method_types=['card'],
+        line_items=[
+            {
+                'price_data': {
+                    'currency': 'usd',
+                    'product_data': {
+                        'name': f'Order {order_id}',
+                    },
+                    'unit_amount': int(order.total_amount * 100),  # Convert to cents
+                },
+                'quantity': 1,
+            },
+        ],
+        mode='payment',
+        success_url=f"https://nail-shop.onrender.com/ordersuccesspage/{order_id}",
+        cancel_url=f"https://nail-shop.onrender.com/cancel",
+        metadata={
+            'order_id': order_id
+        }
+    )
+
+
+@checkout_blueprint.route('/checkout/bootstrap', methods=['GET'])
+@jwt_required()
+def checkout_bootstrap():
+    """Everything the checkout page needs in one response: the user, the
+    cart, the size options and the Stripe publishable key."""
+    user_id = get_jwt_identity()
+    # The user and the id of their cart in one query; sizes come from the
+    # in-process table and a stored cart from the cart store.
+    row = db.session.execute(
+        db.select(User.user_id, User.username, User.email, Cart.cart_id)
+        .outerjoin(Cart, Cart.user_id == User.user_id)
+        .where(User.user_id == user_id)
+        .limit(1)
+    ).first()
+    if row is None:
+        return jsonify({'message': 'User not found'}), 404
+
+    cart = None
+    if cart_store.get_store() is not None:
+        state = cart_store.get_state(user_id)
+        if state is not None:
+            cart = cart_store.to_response(state)
+    elif row.cart_id is not None:
+        cart = cart_response(row.cart_id)
+
+    return jsonify({
+        'user': {'user_id': row.user_id, 'username': row.username, 'email': row.email},
+        'cart': cart,
+        'nail_size_options': size_options.get_table().listing,
+        'publishableKey': current_app.config['STRIPE_PUBLISHABLE_KEY'],
+    })
+
+
+@checkout_blueprint.route('/create-checkout-session', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_checkout_session():
+    try:
+        current_app.logger.info('Received request to create checkout session.')
+        data = request.get_json()
+
+        order_id = data.get('order_id')
+        if not order_id:
+            current_app.logger.error('Missing order_id in request body.')
+            return jsonify({'error': 'Missing order_id in request body'}), 400
+
+        # Check if the checkout session is already cached
+        cache_key = f'checkout_session_{order_id}'
+        cached_session = cache.get(cache_key)
+        if cached_session:
+            current_app.logger.info(f'Found cached session for order_id {order_id}.')
+            return jsonify(cached_session), 200
+
+        # Fetch order details from your database
+        order = Order.query.get(order_id)
+        if not order:
+            current_app.logger.error(f'Order not found for order_id {order_id}.')
+            return jsonify({'error': 'Order not found'}), 404
+
+        current_app.logger.info(f'Creating Stripe checkout session for order_id {order_id}.')
+        # Create a new Stripe Checkout Session
+        stripe = get_stripe()
+        with track_outbound('stripe', 'checkout.session.create'):
+            session = stripe.checkout.Session.create(**checkout_session_params(order))
+
+        # Cache plain data rather than the Stripe object so any cache backend
+        # shared between workers can store it
+        checkout_session = {
+            'sessionId': session.id,
+            'url': session.url,
+            'publishableKey': current_app.config['STRIPE_PUBLISHABLE_KEY']
+        }
+        cache.set(cache_key, checkout_session, timeout=3600)  # Cache for 1 hour
+        current_app.logger.info(f'Checkout session created and cached for order_id {order_id}.')
+
+        return jsonify(checkout_session), 200
+
+    except Exception as e:
+        current_app.logger.error(f'Error creating checkout session: {e}', exc_info=True)
+        return jsonify({'error': 'Failed to create checkout session', 'message': str(e)}), 500
+
+
+@checkout_blueprint.route('/stripe/webhook', methods=['POST'])
+def stripe_webhook():
+    secret = current_app.config['STRIPE_WEBHOOK_SECRET']
+    if not secret:
+        return jsonify({'error': 'Stripe webhook is not configured'}), 503
+
+    stripe = get_stripe()
+    try:
+        event = stripe.Webhook.construct_event(
+            request.get_data(), request.headers.get('Stripe-Signature', ''), secret
+        )
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        current_app.logger.warning(f'Rejected Stripe webhook: {e}')
+        return jsonify({'error': 'Invalid payload or signature'}), 400
+
+    if event['type'] in ('checkout.session.completed', 'checkout.session.async_payment_succeeded'):
+        session = event['data']['object']
+        order_id = (session.get('metadata') or {}).get('order_id')
+        if session.get('payment_status') == 'paid' and order_id:
+            if analytics.record_paid_order(int(order_id)):
+                current_app.logger.info(f'Order {order_id} paid.')
+            db.session.commit()
+
+    return jsonify({'received': True}), 200
@@ -0,0 +1,81 @@
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_STATUS = range(200, 300)
+
+
+def gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def init_app(app):
+    """Compress text responses with brotli or gzip, per Accept-Encoding.
+
+    Buffered bodies below COMPRESS_MIN_SIZE are sent as they are, since
+    compressing them costs more than it saves. Streamed bodies are
+    compressed chunk by chunk as they are generated.
+    """
+    config = app.config
+    if not config['COMPRESS_ENABLED']:
+        return
+    mimetypes = frozenset(config['COMPRESS_MIMETYPES'])
+    min_size = config['COMPRESS_MIN_SIZE']
+    gzip_level = config['COMPRESS_GZIP_LEVEL']
+    brotli_quality = config['COMPRESS_BROTLI_QUALITY']
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    @app.after_request
+    def compress(response):
+        if (response.mimetype not in mimetypes or response.status_code not in COMPRESSIBLE_STATUS
+                or response.direct_passthrough or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        if request.method == 'HEAD' or 'no-transform' in response.headers.get('Cache-Control', ''):
+            return response
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            chunks = response.iter_encoded()
+            if encoding == 'br':
+                response.response = brotli_stream(chunks, brotli_quality)
+            else:
+                response.response = gzip_stream(chunks, gzip_level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            if encoding == 'br':
+                response.set_data(brotli.compress(data, quality=brotli_quality))
+            else:
+                response.set_data(gzip.compress(data, compresslevel=gzip_level, mtime=0))
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed body is a different byte sequence from the one a
+        # strong validator was computed for.
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,13 @@
+from app.models import db
+
+
+def dispose_engines(app):
+    """Forget pooled connections inherited from a parent process.
+
+    Call this in a freshly forked worker when the app was created before the
+    fork (gunicorn ``preload_app``). ``close=False`` leaves the parent's
+    sockets alone and only makes the child open its own.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,108 @@
+import hashlib
+import time
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_sqlalchemy.session import Session
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import Select, TextClause
+from app.extensions import cache, cache_is_shared
+
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'db_primary'
+
+
+def _is_read(clause):
+    if isinstance(clause, Select):
+        return True
+    # Raw SQL (the search queries) counts as a read when it starts like one.
+    if isinstance(clause, TextClause):
+        words = clause.text.split(None, 1)
+        return bool(words) and words[0].lower() in ('select', 'with')
+    return False
+
+
+class RoutingSession(Session):
+    """Sends reads to the ``replica`` bind while ``info['use_replica']`` is
+    set, and everything else to the primary.
+
+    The first write in a session pins it to the primary, so a request reads
+    its own writes and never mixes replica reads into a write transaction.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('use_replica'):
+            if not self._flushing and _is_read(clause):
+                replica = self._db.engines.get(REPLICA)
+                if replica is not None:
+                    return replica
+            else:
+                self.info['use_replica'] = False
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _client_key():
+    """The user behind the request's bearer token, or None when anonymous."""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    token = header[len('Bearer '):]
+    try:
+        return f"user:{decode_token(token)['sub']}"
+    except Exception:
+        # Expired or invalid; the route itself rejects it. Stick per token.
+        return 'token:' + hashlib.sha1(token.encode()).hexdigest()
+
+
+def _sticky_key(client):
+    return f'db_primary:{client}'
+
+
+def init_app(app):
+    """Route read-only requests to the replica when one is configured.
+
+    GET, HEAD and OPTIONS requests read from the replica, unless the same
+    client changed something in the last REPLICA_STICKY_SECONDS; replicas
+    lag, and users expect to see their own writes. The window travels with
+    the client in a signed, expiring cookie, so every worker honours it.
+    With a shared cache it is also kept per user there, for clients that
+    drop cookies.
+    """
+    if REPLICA not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    db = app.extensions['sqlalchemy']
+    sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+    signer = URLSafeSerializer(app.secret_key, salt='db-primary')
+    shared_cache = cache_is_shared(app)
+    if not shared_cache:
+        app.logger.warning('No shared cache (CACHE_REDIS_URL); read-your-writes after a write '
+                           'relies on the db_primary cookie alone')
+
+    def wrote_recently():
+        marker = request.cookies.get(STICKY_COOKIE)
+        if marker:
+            try:
+                if signer.loads(marker) > time.time():
+                    return True
+            except (BadSignature, TypeError):
+                pass
+        client = _client_key() if shared_cache else None
+        return client is not None and bool(cache.get(_sticky_key(client)))
+
+    @app.before_request
+    def choose_database():
+        if request.method not in SAFE_METHODS or wrote_recently():
+            return
+        db.session.info['use_replica'] = True
+
+    @app.after_request
+    def remember_writes(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # SameSite=None: the storefront calls the API cross-site, and
+            # browsers leave Lax cookies off cross-site fetches.
+            response.set_cookie(STICKY_COOKIE, signer.dumps(time.time() + sticky_seconds), max_age=sticky_seconds,
+                                secure=True, httponly=True, samesite='None')
+            client = _client_key() if shared_cache else None
+            if client is not None:
+                cache.set(_sticky_key(client), 1, timeout=sticky_seconds)
+        return response
@@ -0,0 +1,37 @@
+from flask import current_app
+from flask_caching import Cache
+from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
+
+# Extensions are created unbound and attached to an app in create_app(), so
+# several isolated apps can live in the same process.
+jwt = JWTManager()
+migrate = Migrate()
+cache = Cache()
+
+# Backends that keep entries inside the worker process, so a value set by one
+# worker is invisible to the others.
+LOCAL_CACHE_TYPES = ('SimpleCache', 'simple', 'NullCache', 'null')
+
+
+def cache_is_shared(app=None):
+    """Whether ``cache`` is seen by every worker, not just this process."""
+    return (app or current_app).config.get('CACHE_TYPE') not in LOCAL_CACHE_TYPES
+
+
+def get_mail():
+    # Flask-Mail is only needed by the notification routes, so it is imported
+    # and initialised on first use instead of on every worker boot.
+    mail = current_app.extensions.get('mail')
+    if mail is None:
+        from flask_mail import Mail
+        mail = Mail().init_app(current_app)
+    return mail
+
+
+def get_stripe():
+    import stripe
+    stripe.api_key = current_app.config['STRIPE_SECRET_KEY']
+    if current_app.config.get('STRIPE_API_BASE'):
+        stripe.api_base = current_app.config['STRIPE_API_BASE']
+    return stripe
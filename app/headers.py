@@ -0,0 +1,74 @@
+from flask import request, redirect
+
+PREFLIGHT_METHODS = 'DELETE, GET, OPTIONS, POST, PUT'
+PREFLIGHT_HEADERS = 'Authorization, Content-Type, Idempotency-Key'
+
+
+def build_csp(policy):
+    return '; '.join(
+        f"{directive} {' '.join(sources) if isinstance(sources, (list, tuple)) else sources}"
+        for directive, sources in policy.items()
+    )
+
+
+def init_app(app):
+    """Install the security and CORS headers as one precomputed layer.
+
+    Every header that does not depend on the request is built here once per
+    route class (API views and static files); at response time the matching
+    dict is applied with a single ``headers.update``. Only the CORS origin
+    echo is decided per request.
+    """
+    config = app.config
+    security_headers = {
+        'Strict-Transport-Security': f"max-age={config['HSTS_MAX_AGE']}; includeSubDomains",
+        'X-Frame-Options': 'SAMEORIGIN',
+        'X-Content-Type-Options': 'nosniff',
+        'Referrer-Policy': 'strict-origin-when-cross-origin',
+        'Permissions-Policy': 'browsing-topics=()',
+    }
+    api_headers = dict(security_headers, **{
+        'Content-Security-Policy': build_csp(config['CONTENT_SECURITY_POLICY']),
+    })
+    # Product images are embedded by the storefront, which is another origin.
+    static_headers = dict(security_headers, **{
+        'Cross-Origin-Resource-Policy': 'cross-origin',
+    })
+    headers_by_endpoint = {
+        endpoint: static_headers if endpoint == 'static' else api_headers
+        for endpoint in app.view_functions
+    }
+
+    allowed_origins = frozenset(config['CORS_ORIGINS'])
+    cors_headers = {'Access-Control-Allow-Credentials': 'true'}
+    preflight_headers = {
+        'Access-Control-Allow-Methods': PREFLIGHT_METHODS,
+        'Access-Control-Allow-Headers': PREFLIGHT_HEADERS,
+        'Access-Control-Max-Age': str(config['CORS_MAX_AGE']),
+    }
+    force_https = config['FORCE_HTTPS'] and not app.debug and not app.testing
+    plain_http_paths = frozenset(config['FORCE_HTTPS_EXEMPT_PATHS'])
+
+    @app.before_request
+    def enforce_https_and_answer_preflight():
+        if (force_https and not request.is_secure and request.path not in plain_http_paths
+                and request.headers.get('X-Forwarded-Proto', 'http') != 'https'):
+            return redirect(request.url.replace('http://', 'https://', 1), code=302)
+
+        # Answer CORS preflights before auth decorators can reject them; the
+        # origin and security headers are added by apply_headers below.
+        if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+            if request.headers.get('Origin') in allowed_origins:
+                response = app.response_class(status=204)
+                response.headers.update(preflight_headers)
+                return response
+
+    @app.after_request
+    def apply_headers(response):
+        response.headers.update(headers_by_endpoint.get(request.endpoint, api_headers))
+        origin = request.headers.get('Origin')
+        if origin in allowed_origins:
+            response.headers.update(cors_headers)
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.vary.add('Origin')
+        return response
@@ -0,0 +1,84 @@
+import hashlib
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from app.extensions import cache, cache_is_shared
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.05
+
+
+def fingerprint():
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.query_string, request.get_data()):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def replay(record):
+    response = current_app.response_class(record['body'], status=record['status'], mimetype=record['mimetype'])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Run ``view`` at most once per ``Idempotency-Key`` header and user.
+
+    The first request claims the key with an atomic ``cache.add`` and its
+    response is stored for IDEMPOTENCY_TTL seconds; retries with the same
+    key and body get that response back without running the view again.
+    A retry that arrives while the first request is still running waits for
+    it for up to IDEMPOTENCY_WAIT_SECONDS. Reusing a key for a different
+    request is answered with 422. Requests without the header, and 5xx
+    responses, are not recorded. Apply below ``jwt_required()``.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+        config = current_app.config
+        cache_key = f'idempotency:{get_jwt_identity()}:{request.endpoint}:{key}'
+        request_fingerprint = fingerprint()
+        deadline = time.monotonic() + config['IDEMPOTENCY_WAIT_SECONDS']
+        while not cache.add(cache_key, {'fingerprint': request_fingerprint},
+                            timeout=config['IDEMPOTENCY_LOCK_SECONDS']):
+            # None when released between add and get; try to claim it again.
+            record = cache.get(cache_key)
+            if record is not None:
+                if record['fingerprint'] != request_fingerprint:
+                    return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+                if 'status' in record:
+                    return replay(record)
+            if time.monotonic() >= deadline:
+                return jsonify({'error': f'A request with this {HEADER} is still in progress'}), 409
+            time.sleep(POLL_SECONDS)
+
+        try:
+            response = current_app.make_response(current_app.ensure_sync(view)(*args, **kwargs))
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'fingerprint': request_fingerprint,
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'body': response.get_data(),
+            }, timeout=config['IDEMPOTENCY_TTL'])
+        return response
+    return wrapper
+
+
+def init_app(app):
+    if not cache_is_shared(app):
+        app.logger.warning('No shared cache (CACHE_REDIS_URL); Idempotency-Key retries are only '
+                           'deduplicated when they reach the same worker')
@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify, make_response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import User
+
+main_blueprint = Blueprint("main", __name__)
+
+
+@main_blueprint.route('/user/<int:user_id>', methods=['GET'])
+def get_user(user_id):
+    try:
+        user = User.query.get(user_id)
+        if user:
+            return jsonify(user.to_response())
+        else:
+            return jsonify({'error': 'User not found'}), 404
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch user', 'message': str(e)}), 500
+
+@main_blueprint.app_errorhandler(500)
+def internal_error(error):
+    current_app.logger.error(f'Internal Server Error: {error}')
+    return jsonify({'error': 'Internal Server Error', 'message': str(error)}), 500
+
+@main_blueprint.route('/')
+def index():
+    response = make_response("Setting a cookie")
+    response.set_cookie(
+        'my_cookie',
+        'cookie_value',
+        secure=True,
+        httponly=True,
+        samesite='None'  # Use 'Lax' or 'Strict' if possible
+    )
+    return response
+
+@main_blueprint.route('/debug-token', methods=['GET'])
+@jwt_required()
+def debug_token():
+    current_user_id = get_jwt_identity()
+    return jsonify({"current_user_id": current_user_id}), 200
@@ -0,0 +1,143 @@
+import os
+import time
+from contextlib import contextmanager
+from flask import g, request, current_app, has_request_context
+from sqlalchemy import event
+
+# Histograms are process-wide (prometheus_client keeps a global registry), so
+# they are created once even when several apps share a process.
+_instruments = None
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _create_instruments():
+    global _instruments
+    if _instruments is None:
+        from prometheus_client import Counter, Histogram
+
+        _instruments = {
+            'request_latency': Histogram(
+                'http_request_duration_seconds', 'Request latency by endpoint.',
+                ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS,
+            ),
+            'request_queries': Histogram(
+                'http_request_db_queries', 'SQL statements issued per request.',
+                ['endpoint'], buckets=QUERY_COUNT_BUCKETS,
+            ),
+            'request_db_time': Histogram(
+                'http_request_db_duration_seconds', 'Time spent in SQL per request.',
+                ['endpoint'], buckets=LATENCY_BUCKETS,
+            ),
+            'outbound_latency': Histogram(
+                'outbound_request_duration_seconds', 'Calls to Stripe, SMTP and other services.',
+                ['service', 'operation', 'outcome'], buckets=LATENCY_BUCKETS,
+            ),
+            'statements': Counter(
+                'db_statements', 'SQL statements by fingerprint (see app/slow_queries.py).',
+                ['fingerprint'],
+            ),
+            'statement_time': Counter(
+                'db_statement_duration_seconds', 'Time spent in SQL by fingerprint.',
+                ['fingerprint'],
+            ),
+        }
+    return _instruments
+
+
+@contextmanager
+def track_outbound(service, operation):
+    """Time a call to an external service; a no-op when metrics are off."""
+    if _instruments is None:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        _instruments['outbound_latency'].labels(service, operation, outcome).observe(time.perf_counter() - started)
+
+
+def observe_statement(fingerprint, elapsed):
+    if _instruments is not None:
+        _instruments['statements'].labels(fingerprint).inc()
+        _instruments['statement_time'].labels(fingerprint).inc(elapsed)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context rather than the connection, so a statement
+    # that raises leaves nothing behind for the next one to pick up.
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_time = g.get('db_time', 0.0) + elapsed
+
+
+def metrics_view():
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return {'error': 'Unauthorized'}, 401
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Each gunicorn worker writes its samples to files in this directory;
+        # merge them so a scrape sees the whole server, not one worker.
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+
+def instrument_engine(engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app):
+    """Record request latency, per-request SQL counts and outbound call
+    timings, and serve them at ``/metrics``.
+
+    With several gunicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an
+    empty directory before the server starts (see gunicorn.conf.py).
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    from app.models import db
+
+    instruments = _create_instruments()
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_started' not in g or request.endpoint == 'metrics':
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        instruments['request_latency'].labels(endpoint, request.method, response.status_code).observe(
+            time.perf_counter() - g.metrics_started
+        )
+        instruments['request_queries'].labels(endpoint).observe(g.get('db_queries', 0))
+        instruments['request_db_time'].labels(endpoint).observe(g.get('db_time', 0.0))
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -5,9 +5,10 @@ from datetime import timedelta, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import get_jwt_identity
 import jwt
+from app.db_routing import RoutingSession
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 def get_current_user():
     user_id = get_jwt_identity()
@@ -40,6 +41,12 @@ class User(db.Model):
     
     orders = db.relationship('Order', backref='user', lazy=True)
     carts = db.relationship('Cart', backref='user', lazy=True)
+
+    # Case-insensitive prefix search and keyset pagination in GET /user/
+    __table_args__ = (
+        db.Index('ix_user_username_lower', func.lower(username)),
+        db.Index('ix_user_email_lower', func.lower(email)),
+    )
    
     def __init__(self, username, email, password, avatar_image=None):
         self.username = username
@@ -151,7 +158,7 @@ class Order(db.Model):
     postal_code = db.Column(db.String(20))
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), nullable=False)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
 
     order_items = db.relationship('OrderItem', backref='order', lazy=True)
 
@@ -203,7 +210,7 @@ class Order(db.Model):
 class OrderItem(db.Model):
     __tablename__ = 'order_item'
     order_item_id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.order_id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.order_id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
@@ -232,8 +239,8 @@ class OrderItem(db.Model):
         db.session.commit()
 
     def to_response(self):
+        from app import size_options
         product = Product.query.get(self.product_id)
-        nail_size_option = NailSizeOption.query.get(self.nail_size_option_id)
         return {
             "order_item_id": self.order_item_id,
             "order_id": self.order_id,
@@ -241,7 +248,7 @@ class OrderItem(db.Model):
             "product_name": product.name,
             "quantity": self.quantity,
             "unit_price": self.unit_price,
-            "nail_size_option": nail_size_option.name,  # Use the name attribute here
+            "nail_size_option": size_options.name(self.nail_size_option_id),
             "left_hand_custom_size": self.left_hand_custom_size,
             "right_hand_custom_size": self.right_hand_custom_size
         }
@@ -250,7 +257,7 @@ class OrderItem(db.Model):
 class Cart(db.Model):
     __tablename__ = 'cart'
     cart_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.user_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.user_id'), nullable=False, index=True)
     total_amount = db.Column(db.Float, nullable=False, default=0.0)
 
     items = db.relationship('CartItem', backref='cart', cascade='all, delete-orphan')
@@ -282,7 +289,7 @@ class Cart(db.Model):
 class CartItem(db.Model):
     __tablename__ = 'cart_item'
     cart_item_id = db.Column(db.Integer, primary_key=True)
-    cart_id = db.Column(db.Integer, db.ForeignKey('cart.cart_id'), nullable=False)
+    cart_id = db.Column(db.Integer, db.ForeignKey('cart.cart_id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
@@ -315,8 +322,8 @@ class CartItem(db.Model):
         db.session.commit()
 
     def to_response(self):
+        from app import size_options
         product = Product.query.get(self.product_id)
-        nail_size_option = NailSizeOption.query.get(self.nail_size_option_id)
         return {
             "cart_item_id": self.cart_item_id,
             "cart_id": self.cart_id,
@@ -324,7 +331,31 @@ class CartItem(db.Model):
             "product_name": product.name,
             "quantity": self.quantity,
             "unit_price": self.unit_price,
-            "nail_size_option": nail_size_option.name,
+            "nail_size_option": size_options.name(self.nail_size_option_id),
             "left_hand_custom_size": self.left_hand_custom_size,
             "right_hand_custom_size": self.right_hand_custom_size
         }
+
+
+# Daily sales rollups, maintained by app/analytics.py as orders are paid.
+# Reports read only these tables, so their cost does not grow with the
+# order history.
+
+class DailyProductSales(db.Model):
+    __tablename__ = 'daily_product_sales'
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_daily_product_sales_product_day', 'product_id', 'day'),)
+
+
+class DailySizeSales(db.Model):
+    __tablename__ = 'daily_size_sales'
+    day = db.Column(db.Date, primary_key=True)
+    nail_size_option_id = db.Column(db.Integer, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
@@ -1,5 +1,7 @@
 from flask import Flask, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import size_options
+from app.auth import admin_required
 from app.models import db, Product, Cart, CartItem, NailSizeOption
 from flask import Blueprint
 
@@ -7,10 +9,15 @@ nail_sizes_blueprint = Blueprint("nail_sizes", __name__, url_prefix="/nail_sizes
 
 @nail_sizes_blueprint.route('/', methods=['GET'])
 def get_nail_size_options():
-    nail_size_options = NailSizeOption.query.all()
-    return jsonify([option.to_dict() for option in nail_size_options]), 200
+    # Served from the in-process table; clients revalidate with If-None-Match
+    table = size_options.get_table()
+    response = jsonify(table.listing)
+    response.set_etag(table.etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @nail_sizes_blueprint.route('/create', methods=['POST'])
+@admin_required
 def create_nail_size_option():
     data = request.get_json()
     name = data.get('name')
@@ -22,5 +29,6 @@ def create_nail_size_option():
     nail_size_option = NailSizeOption(name=name, description=description)
     db.session.add(nail_size_option)
     db.session.commit()
+    size_options.options_changed()
 
-    return jsonify(nail_size_option.to_dict()), 201
\ No newline at end of file
+    return jsonify(nail_size_option.to_dict()), 201
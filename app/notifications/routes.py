@@ -0,0 +1,161 @@
+import os
+from flask import Blueprint, request, jsonify, redirect, url_for, session, render_template, current_app
+from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import joinedload, selectinload
+from app.extensions import get_mail
+from app.metrics import track_outbound
+from app.models import User, Order, OrderItem, get_current_user
+
+notifications_blueprint = Blueprint("notifications", __name__)
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.send']
+CLIENT_SECRETS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'client_secrets.json')
+
+
+def get_oauth_flow(state=None):
+    # google_auth_oauthlib is heavy to import and only the OAuth routes need it.
+    from google_auth_oauthlib.flow import Flow
+
+    if not os.path.exists(CLIENT_SECRETS_FILE):
+        raise FileNotFoundError(f"Client secrets file not found at path: {CLIENT_SECRETS_FILE}")
+
+    return Flow.from_client_secrets_file(
+        CLIENT_SECRETS_FILE,
+        scopes=SCOPES,
+        state=state,
+        redirect_uri=url_for('notifications.oauth2_callback', _external=True)
+    )
+
+@notifications_blueprint.route('/authorize')
+def authorize():
+    flow = get_oauth_flow()
+    authorization_url, state = flow.authorization_url(
+        access_type='offline',
+        include_granted_scopes='true'
+    )
+    session['state'] = state
+    return redirect(authorization_url)
+
+@notifications_blueprint.route('/oauth2/callback')
+def oauth2_callback():
+    state = session.get('state')
+    if not state:
+        return jsonify({'error': 'State not found in session'}), 400
+
+    flow = get_oauth_flow(state=state)
+    flow.fetch_token(authorization_response=request.url)
+    credentials = flow.credentials
+
+    session['credentials'] = credentials_to_dict(credentials)
+    current_app.logger.info('Gmail credentials stored in session')
+    return redirect(url_for('notifications.send_emails'))
+
+def credentials_to_dict(credentials):
+    return {
+        'token': credentials.token,
+        'refresh_token': credentials.refresh_token,
+        'token_uri': credentials.token_uri,
+        'client_id': credentials.client_id,
+        'client_secret': credentials.client_secret,
+        'scopes': credentials.scopes
+    }
+
+def get_gmail_service():
+    try:
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+        credentials = service_account.Credentials.from_service_account_file('app/config/nail-shop.json')
+        return build('gmail', 'v1', credentials=credentials)
+    except ValueError as e:
+        current_app.logger.error(f"ValueError: {str(e)}")
+        return None
+    except Exception as e:
+        current_app.logger.error(f"Exception in get_gmail_service: {str(e)}")
+        return None
+
+def render_order_emails(user, order, order_items):
+    """Render the customer and developer confirmation emails for an order."""
+    user_email_body = render_template(
+        'customer_email.html',
+        customer_name=user.email,
+        order=order,
+        order_items=order_items,
+        total_amount=order.total_amount
+    )
+    developer_email_body = render_template(
+        'developer_email.html',
+        customer_name=user.email,
+        order=order,
+        order_items=order_items,
+        total_amount=order.total_amount
+    )
+    return user_email_body, developer_email_body
+
+@notifications_blueprint.route('/send-emails', methods=['POST'])
+@jwt_required()
+def send_emails():
+    current_user = get_current_user()
+
+    if not current_user:
+        return jsonify({'message': 'User not found'}), 404
+
+    if not request.is_json:
+        return jsonify({'message': 'Request payload must be in JSON format'}), 400
+
+    data = request.get_json()
+    user_id = data.get('user_id')
+    order_id = data.get('order_id')
+
+    # Fetch user details
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    # Fetch order details with the items and products the email templates
+    # render; size names come from the in-process size option table
+    order = Order.query.options(
+        selectinload(Order.order_items).joinedload(OrderItem.product)
+    ).get(order_id)
+    if not order or order.user_id != user_id:
+        return jsonify({'message': 'Order not found or does not belong to the user'}), 404
+
+    order_items = order.order_items
+
+    # Developer email from environment variables
+    developer_email = os.environ.get('DEVELOPER_EMAIL')
+    if not developer_email:
+        return jsonify({'message': 'Developer email not configured'}), 500
+
+    user_email_body, developer_email_body = render_order_emails(user, order, order_items)
+
+    from flask_mail import Message
+    mail = get_mail()
+
+    # Send email to customer
+    customer_msg = Message(
+        'Order Confirmation',
+        recipients=[user.email],
+        html=user_email_body
+    )
+    with track_outbound('smtp', 'send'):
+        mail.send(customer_msg)
+
+    # Send email to developer
+    developer_msg = Message(
+        'New Order Received',
+        recipients=[developer_email],
+        html=developer_email_body
+    )
+    with track_outbound('smtp', 'send'):
+        mail.send(developer_msg)
+
+    return jsonify({'message': 'Emails sent successfully'}), 200
+
+def send_message(service, user_id, message):
+    try:
+        message = service.users().messages().send(userId='me', body=message).execute()
+        current_app.logger.info('Message Id: %s', message['id'])
+        return message
+    except Exception as error:
+        current_app.logger.error('An error occurred: %s', error)
+        raise
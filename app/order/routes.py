@@ -1,43 +1,53 @@
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from app import cart_store, size_options
+from app.idempotency import idempotent
 from app.models import db, Order, OrderItem, User, Product, CartItem, Cart, NailSizeOption
 from flask import Blueprint
-from app import app
 
 order_blueprint = Blueprint("order", __name__, url_prefix="/order")
 
 @order_blueprint.route('/create_preliminary_order', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_preliminary_order():
     data = request.json
     user_id = get_jwt_identity()
     total_amount = data.get('total_amount')
 
     try:
-        order = Order(user_id=user_id, total_amount=total_amount, status='Processing')
-        db.session.add(order)
-        db.session.commit()
-
+        cart_store.persist(user_id)
         # Fetch the user's cart
-        cart = Cart.query.filter_by(user_id=user_id).first()
+        cart = Cart.query.filter_by(user_id=user_id).options(
+            selectinload(Cart.items).joinedload(CartItem.product)
+        ).first()
         if not cart:
             return jsonify({'success': False, 'error': 'Cart not found'}), 404
 
-        # Create order items from cart items
-        for item in cart.items:
-            order_item = OrderItem(
-                order_id=order.order_id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                unit_price=item.product.price,
-                nail_size_option_id=item.nail_size_option_id
-            )
-            db.session.add(order_item)
+        order = Order(user_id=user_id, total_amount=total_amount, status='Processing')
+        db.session.add(order)
+        db.session.flush()
+        order_id = order.order_id
+
+        # Create order items from cart items in one executemany
+        if cart.items:
+            db.session.execute(insert(OrderItem), [
+                {
+                    'order_id': order_id,
+                    'product_id': item.product_id,
+                    'quantity': item.quantity,
+                    'unit_price': item.product.price,
+                    'nail_size_option_id': item.nail_size_option_id,
+                }
+                for item in cart.items
+            ])
 
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Preliminary order created successfully', 'order_id': order.order_id}), 201
+        return jsonify({'success': True, 'message': 'Preliminary order created successfully', 'order_id': order_id}), 201
     except Exception as e:
-        app.logger.error(f'Error creating preliminary order: {e}')
+        current_app.logger.error(f'Error creating preliminary order: {e}')
         return jsonify({'success': False, 'error': 'Failed to create preliminary order', 'message': str(e)}), 500
 
 
@@ -106,7 +116,7 @@ def get_order(order_id):
         else:
             return jsonify({'message': 'Order not found'}), 404
     except Exception as e:
-        app.logger.error(f'Error fetching order: {e}')
+        current_app.logger.error(f'Error fetching order: {e}')
         return jsonify({'error': 'Failed to fetch order', 'message': str(e)}), 500
 
 
@@ -139,6 +149,7 @@ def read_order(order_id):
                 'quantity': order_item.quantity,
                 'unit_price': order_item.unit_price,
                 'nail_size_option_id': order_item.nail_size_option_id,
+                'nail_size_option': size_options.name(order_item.nail_size_option_id),
                 'left_hand_custom_size': order_item.left_hand_custom_size,
                 'right_hand_custom_size': order_item.right_hand_custom_size
             }
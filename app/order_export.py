@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import select
+from app.models import db, User, Order, OrderItem, Product, NailSizeOption
+
+orders_cli = AppGroup('orders', help='Order fulfillment tools.')
+
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 64 * 1024
+
+COLUMNS = {
+    'order_id': Order.order_id,
+    'created_at': Order.created_at,
+    'status': Order.status,
+    'user_id': Order.user_id,
+    'email': User.email,
+    'first_name': Order.first_name,
+    'last_name': Order.last_name,
+    'street_address': Order.street_address,
+    'city': Order.city,
+    'state': Order.state,
+    'country': Order.country,
+    'postal_code': Order.postal_code,
+    'order_total': Order.total_amount,
+    'order_item_id': OrderItem.order_item_id,
+    'product_id': OrderItem.product_id,
+    'product_name': Product.name,
+    'quantity': OrderItem.quantity,
+    'unit_price': OrderItem.unit_price,
+    'nail_size_option': NailSizeOption.name,
+    'left_hand_custom_size': OrderItem.left_hand_custom_size,
+    'right_hand_custom_size': OrderItem.right_hand_custom_size,
+}
+
+
+def export_query(start=None, end=None, status=None):
+    """One row per order item, for orders created from ``start`` to ``end``
+    (dates, inclusive)."""
+    query = (
+        select(*(column.label(name) for name, column in COLUMNS.items()))
+        .select_from(Order)
+        .join(User, User.user_id == Order.user_id)
+        .join(OrderItem, OrderItem.order_id == Order.order_id)
+        .join(Product, Product.product_id == OrderItem.product_id)
+        .join(NailSizeOption, NailSizeOption.nail_size_option_id == OrderItem.nail_size_option_id)
+        .order_by(Order.order_id, OrderItem.order_item_id)
+    )
+    if start:
+        query = query.where(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        query = query.where(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if status:
+        query = query.where(Order.status == status)
+    return query
+
+
+def _rows(query, batch_size):
+    # A dedicated connection with a server-side cursor: rows arrive from the
+    # database ``batch_size`` at a time instead of all at once.
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result:
+            yield row
+
+
+def _format_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_chunks(query, fmt, compress=False, batch_size=1000):
+    """Yield the export as byte chunks of about CHUNK_SIZE, gzip-compressed
+    when ``compress``. Only one chunk and one batch of rows are in memory."""
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+
+    def take():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    if writer:
+        writer.writerow(COLUMNS)
+    for row in _rows(query, batch_size):
+        if writer:
+            writer.writerow([_format_value(value) for value in row])
+        else:
+            buffer.write(json.dumps({key: _format_value(value) for key, value in row._mapping.items()}))
+            buffer.write('\n')
+        if buffer.tell() >= CHUNK_SIZE:
+            chunk = take()
+            if chunk:
+                yield chunk
+    chunk = take()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+@orders_cli.command('export')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='csv', show_default=True)
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First order day.')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last order day.')
+@click.option('--status', help='Only orders with this status.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('-o', '--output', type=click.File('wb'), default='-', help='Defaults to stdout.')
+@with_appcontext
+def export_command(fmt, start, end, status, compress, output):
+    """Stream orders with their items, shipping addresses and sizes."""
+    query = export_query(start.date() if start else None, end.date() if end else None, status)
+    for chunk in export_chunks(query, fmt, compress):
+        output.write(chunk)
+
+
+def init_app(app):
+    app.cli.add_command(orders_cli)
@@ -1,7 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from app.auth import admin_required
+from app.extensions import get_stripe
+from app.metrics import track_outbound
 from app.models import db, Product
+from app import typeahead
+from app.product_import import ImportFormatError, import_products, validate
+from app.search import SearchUnavailable, search_products
 import os
-import stripe
 from werkzeug.utils import secure_filename
 
 product_blueprint = Blueprint("product_blueprint", __name__, url_prefix="/product")
@@ -9,6 +14,8 @@ product_blueprint = Blueprint("product_blueprint", __name__, url_prefix="/produc
 # Define the upload folder
 UPLOAD_FOLDER = 'nails'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+# product_id is a 32-bit integer column.
+MAX_PRODUCT_ID = 2 ** 31 - 1
 
 
 
@@ -50,6 +57,7 @@ def create_product():
     # Add the product to the database session and commit changes
     db.session.add(product)
     db.session.commit()
+    typeahead.product_saved(product)
 
     # Return a JSON response indicating success and the created product data
     return jsonify({'success': True, 'message': 'Product created successfully', 'data': product.to_response()}), 201
@@ -60,11 +68,17 @@ def update_product(product_id):
     if not product:
         return jsonify({'error': 'Product not found'}), 404
 
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    values, errors = validate(data, partial=True)
+    if errors:
+        return jsonify({'error': '; '.join(errors)}), 400
     try:
-        for key, value in data.items():
+        for key, value in values.items():
             setattr(product, key, value)
         db.session.commit()
+        typeahead.product_saved(product)
         return jsonify({'success': True, 'message': 'Product updated successfully', 'data': product.to_response()})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -78,10 +92,41 @@ def delete_product(product_id):
     try:
         db.session.delete(product)
         db.session.commit()
+        typeahead.product_deleted(product_id)
         return jsonify({'success': True, 'message': 'Product deleted successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@product_blueprint.route('/import', methods=['POST'])
+@admin_required
+def import_catalog():
+    # Either a multipart upload in the `file` field or the raw request body;
+    # both are read row by row.
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format')
+    if fmt is None:
+        content_type = upload.mimetype if upload else request.mimetype
+        filename = (upload.filename if upload else None) or ''
+        jsonl = 'json' in content_type or filename.endswith(('.jsonl', '.ndjson'))
+        fmt = 'jsonl' if jsonl else 'csv'
+    try:
+        summary = import_products(
+            stream, fmt,
+            batch_size=current_app.config['PRODUCT_IMPORT_BATCH_SIZE'],
+            max_errors=current_app.config['PRODUCT_IMPORT_MAX_ERRORS'],
+        )
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'The file is not UTF-8 encoded'}), 400
+    status = 200 if not summary['failed'] else 207 if summary['imported'] else 400
+    return jsonify({
+        'success': not summary['failed'],
+        'message': f"Imported {summary['imported']} of {summary['processed']} products",
+        'data': summary,
+    }), status
+
 @product_blueprint.route('/read_all', methods=['GET'])
 def get_products():
     try:
@@ -89,9 +134,95 @@ def get_products():
         response = [{'id': product.product_id, 'name': product.name, 'price': product.price, 'description': product.description, 'image_url': product.image_url} for product in products]
         return jsonify({'success': True, 'message': 'Products retrieved successfully', 'data': response})
     except Exception as e:
-        print(e)  # Print the error message
+        current_app.logger.exception('Error retrieving products')
         return jsonify({'error': str(e)}), 500
 
+@product_blueprint.route('/search', methods=['GET'])
+def search():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 50)
+
+    try:
+        results, total = search_products(q, page, per_page)
+    except SearchUnavailable as e:
+        current_app.logger.error(str(e))
+        return jsonify({'error': 'Search unavailable'}), 503
+
+    return jsonify({
+        'success': True,
+        'message': 'Products retrieved successfully',
+        'data': results,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+        },
+    })
+
+@product_blueprint.route('/suggest', methods=['GET'])
+def suggest():
+    q = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    suggestions = typeahead.get_index().suggest(q, limit)
+    return jsonify({'success': True, 'data': [{'id': product_id, 'name': name} for product_id, name in suggestions]})
+
+def requested_ids():
+    """The ids of a /product/batch request in the order given, without
+    duplicates, or None when they are not all integers."""
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        values = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(values, list):
+            return None
+    else:
+        values = [value for arg in request.args.getlist('ids') for value in arg.split(',') if value.strip()]
+    ids = []
+    for value in values:
+        if isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                return None
+        # bool is an int subclass, and floats must not be truncated.
+        if type(value) is not int or not 0 < value <= MAX_PRODUCT_ID:
+            return None
+        ids.append(value)
+    return list(dict.fromkeys(ids))
+
+@product_blueprint.route('/batch', methods=['GET', 'POST'])
+def get_products_batch():
+    ids = requested_ids()
+    if not ids:
+        return jsonify({'success': False, 'error': 'ids must be a non-empty list of product ids'}), 400
+    max_ids = current_app.config['PRODUCT_BATCH_MAX_IDS']
+    if len(ids) > max_ids:
+        return jsonify({'success': False, 'error': f'At most {max_ids} ids per request'}), 400
+
+    rows = db.session.execute(
+        db.select(Product.product_id, Product.name, Product.price, Product.description, Product.image_url)
+        .where(Product.product_id.in_(ids))
+    ).all()
+    found = {
+        row.product_id: {
+            'id': row.product_id,
+            'name': row.name,
+            'price': row.price,
+            'description': row.description,
+            'image_url': row.image_url,
+        }
+        for row in rows
+    }
+    return jsonify({
+        'success': True,
+        'message': 'Products retrieved successfully',
+        'data': [found[product_id] for product_id in ids if product_id in found],
+        'missing': [product_id for product_id in ids if product_id not in found],
+    })
+
 @product_blueprint.route('/read/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     try:
@@ -132,13 +263,15 @@ def create_checkout_session():
             } for item in data['items']
         ]
 
-        session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=line_items,
-            mode='payment',
-            success_url='https://custom-nails-backend.onrender.com/ordersuccesspage',  # Replace with your frontend success URL
-            cancel_url='https://custom-nails-backend.onrender.com/cancel',  # Replace with your frontend cancel URL
-        )
+        stripe = get_stripe()
+        with track_outbound('stripe', 'checkout.session.create'):
+            session = stripe.checkout.Session.create(
+                payment_method_types=['card'],
+                line_items=line_items,
+                mode='payment',
+                success_url='https://custom-nails-backend.onrender.com/ordersuccesspage',  # Replace with your frontend success URL
+                cancel_url='https://custom-nails-backend.onrender.com/cancel',  # Replace with your frontend cancel URL
+            )
 
         return jsonify({'clientSecret': session.client_secret})
     except Exception as e:
@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from app import typeahead
+from app.models import db, Product
+from app.seed import _reset_sequence
+
+products_cli = AppGroup('products', help='Bulk product maintenance.')
+
+REQUIRED = ('name', 'price', 'quantity_available')
+FIELDS = ('product_id',) + REQUIRED + ('description', 'image_url')
+MAX_LENGTHS = {'name': 100, 'image_url': 200}
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def validate(data, partial=False):
+    """Return ``(values, errors)`` for one product row.
+
+    Unknown keys and, unless ``partial``, missing required fields are
+    errors. Empty strings count as missing, so CSV files can leave optional
+    columns blank.
+    """
+    values, errors = {}, []
+    for key, value in data.items():
+        if key not in FIELDS or (partial and key == 'product_id'):
+            errors.append(f'unknown field {key!r}')
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+        if value is None:
+            if key in REQUIRED:
+                errors.append(f'{key} is required')
+            elif key != 'product_id':
+                values[key] = None
+            continue
+        try:
+            if key in ('product_id', 'quantity_available'):
+                value = int(value)
+                if value < (1 if key == 'product_id' else 0):
+                    raise ValueError
+            elif key == 'price':
+                value = round(float(value), 2)
+                if not value >= 0:
+                    raise ValueError
+            else:
+                value = str(value)
+                if len(value) > MAX_LENGTHS.get(key, len(value)):
+                    errors.append(f'{key} is longer than {MAX_LENGTHS[key]} characters')
+                    continue
+        except (TypeError, ValueError):
+            errors.append(f'{key} must be a non-negative {"number" if key == "price" else "integer"}')
+            continue
+        values[key] = value
+    if not partial:
+        errors.extend(f'{key} is required' for key in REQUIRED if key not in data)
+    return values, errors
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line, data)`` from a binary stream of CSV or JSONL, one row
+    at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        if reader.fieldnames is None:
+            return
+        for data in reader:
+            if None in data:
+                yield reader.line_num, {'': 'too many columns'}
+                continue
+            yield reader.line_num, data
+    elif fmt == 'jsonl':
+        for line, raw in enumerate(text, start=1):
+            if not raw.strip():
+                continue
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                yield line, {'': 'not a JSON object'}
+                continue
+            yield line, data
+    else:
+        raise ImportFormatError(f'Unsupported format {fmt!r}; use csv or jsonl')
+
+
+def _upsert(connection, columns, rows):
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert(Product.__table__)
+    elif dialect == 'sqlite':
+        insert = sqlite.insert(Product.__table__)
+    else:
+        raise ImportFormatError(f'Bulk import is not supported on {dialect}')
+    if 'product_id' in columns:
+        insert = insert.on_conflict_do_update(
+            index_elements=['product_id'],
+            set_={column: insert.excluded[column] for column in columns if column != 'product_id'},
+        )
+    connection.execute(insert, rows)
+
+
+def import_products(stream, fmt, batch_size=1000, max_errors=100):
+    """Validate and upsert products from ``stream``, one transaction per batch.
+
+    Rows with a ``product_id`` update that product, or create it with that
+    id; rows without one are inserted. Only the columns a row provides are
+    written. A batch the database rejects is rolled back on its own and
+    reported against its first line. Returns a summary with at most
+    ``max_errors`` error entries.
+    """
+    summary = {'processed': 0, 'imported': 0, 'failed': 0, 'errors': []}
+    # Rows are batched by the set of columns they provide, since one
+    # executemany needs one statement shape.
+    batches = {}
+    explicit_ids = False
+
+    def error(line, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'line': line, 'error': message})
+
+    def flush(columns):
+        nonlocal explicit_ids
+        lines, rows = zip(*batches.pop(columns))
+        try:
+            with db.engine.begin() as connection:
+                _upsert(connection, columns, list(rows))
+        except SQLAlchemyError as exc:
+            summary['failed'] += len(rows) - 1
+            reason = getattr(exc, 'orig', None) or exc
+            error(lines[0], f'batch of {len(rows)} rows from this line rejected: {reason}')
+            return
+        summary['imported'] += len(rows)
+        explicit_ids = explicit_ids or 'product_id' in columns
+
+    for line, data in read_rows(stream, fmt):
+        summary['processed'] += 1
+        values, errors = validate(data) if '' not in data else ({}, [data['']])
+        if errors:
+            error(line, '; '.join(errors))
+            continue
+        columns = tuple(sorted(values))
+        batches.setdefault(columns, []).append((line, values))
+        if len(batches[columns]) >= batch_size:
+            flush(columns)
+    for columns in list(batches):
+        flush(columns)
+
+    if explicit_ids:
+        with db.engine.begin() as connection:
+            _reset_sequence(connection, Product.__tablename__, 'product_id')
+    if summary['imported']:
+        typeahead.products_changed()
+    summary['errors_truncated'] = summary['failed'] > len(summary['errors'])
+    return summary
+
+
+@products_cli.command('import')
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--max-errors', default=100, show_default=True, help='Errors to print.')
+@with_appcontext
+def import_command(file, fmt, batch_size, max_errors):
+    """Upsert products from a CSV or JSONL FILE ("-" for stdin).
+
+    Columns: product_id (optional), name, price, quantity_available,
+    description, image_url.
+    """
+    if fmt is None:
+        fmt = 'jsonl' if file.name.endswith(('.jsonl', '.ndjson')) else 'csv'
+    try:
+        summary = import_products(file, fmt, batch_size, max_errors)
+    except ImportFormatError as exc:
+        raise click.ClickException(str(exc))
+    for entry in summary['errors']:
+        click.echo(f'line {entry["line"]}: {entry["error"]}', err=True)
+    click.echo(f'{summary["processed"]} rows, {summary["imported"]} imported, {summary["failed"]} failed')
+    if summary['failed']:
+        raise SystemExit(1)
+
+
+def init_app(app):
+    app.cli.add_command(products_cli)
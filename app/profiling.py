@@ -0,0 +1,130 @@
+import os
+import random
+import re
+import threading
+import time
+import click
+from flask import g, request, current_app
+from flask.cli import AppGroup
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+profiles_cli = AppGroup('profiles', help='Inspect request profiles.')
+
+
+def _signer(secret):
+    from itsdangerous import TimestampSigner
+    return TimestampSigner(secret, salt='request-profile')
+
+
+def _prune(directory, keep):
+    files = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.prof')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in files[:max(len(files) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def init_app(app):
+    """Profile a sample of requests, or requests carrying a signed
+    ``X-Profile-Token`` header, with cProfile.
+
+    Profiles are written to ``PROFILE_DIR`` as
+    ``<time>-<endpoint>-<duration>ms-<pid>.prof``; only the newest
+    ``PROFILE_MAX_FILES`` are kept. Without ``PROFILE_SECRET`` and a
+    ``PROFILE_SAMPLE_RATE`` above 0 no request hooks are installed at all.
+    """
+    app.cli.add_command(profiles_cli)
+
+    config = app.config
+    secret = config['PROFILE_SECRET']
+    sample_rate = config['PROFILE_SAMPLE_RATE']
+    if not secret and sample_rate <= 0:
+        return
+
+    import cProfile
+
+    signer = _signer(secret) if secret else None
+    directory = config['PROFILE_DIR']
+    keep = config['PROFILE_MAX_FILES']
+    max_age = config['PROFILE_TOKEN_MAX_AGE']
+    os.makedirs(directory, exist_ok=True)
+    # Only one profiler can be active at a time, so concurrent requests in
+    # threaded workers are not profiled while another one is.
+    active = threading.Lock()
+
+    def requested():
+        token = request.headers.get(PROFILE_HEADER)
+        if not token or signer is None:
+            return False
+        try:
+            signer.unsign(token, max_age=max_age)
+        except Exception:
+            return False
+        return True
+
+    @app.before_request
+    def start_profile():
+        if not (requested() or random.random() < sample_rate):
+            return
+        if not active.acquire(blocking=False):
+            return
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    @app.teardown_request
+    def write_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        try:
+            profiler.disable()
+            duration_ms = (time.perf_counter() - g.profile_started) * 1000
+            endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unmatched')
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{endpoint}-{duration_ms:.0f}ms-{os.getpid()}.prof"
+            profiler.dump_stats(os.path.join(directory, name))
+            _prune(directory, keep)
+        except Exception:
+            current_app.logger.exception('Could not write request profile')
+        finally:
+            active.release()
+
+
+@profiles_cli.command('token')
+def token_command():
+    """Print a signed value for the X-Profile-Token header."""
+    secret = current_app.config['PROFILE_SECRET']
+    if not secret:
+        raise click.ClickException('PROFILE_SECRET is not set')
+    click.echo(_signer(secret).sign('profile').decode())
+
+
+@profiles_cli.command('report')
+@click.option('--top', default=25, show_default=True, help='Number of functions to show.')
+@click.option('--endpoint', help='Only include profiles of this endpoint.')
+@click.option('--sort', default='cumulative', show_default=True, help='pstats sort key.')
+@click.option('--dir', 'directory', help='Profile directory (defaults to PROFILE_DIR).')
+def report_command(top, endpoint, sort, directory):
+    """Aggregate the stored profiles into one top-N report."""
+    import pstats
+
+    directory = directory or current_app.config['PROFILE_DIR']
+    if not os.path.isdir(directory):
+        raise click.ClickException(f'No profile directory at {directory}')
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith('.prof') and (endpoint is None or f'-{endpoint}-' in name)
+    )
+    if not paths:
+        raise click.ClickException('No matching profiles')
+
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    click.echo(f'{len(paths)} profiles from {directory}')
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
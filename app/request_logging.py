@@ -0,0 +1,123 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, request, has_request_context
+from flask.logging import default_handler
+
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+access_logger = logging.getLogger('app.access')
+
+# One listener per process: logging handlers are process-wide, and a thread
+# started before a fork does not exist in the child (see restart_listener).
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including the request fields attached by
+    RequestContextFilter."""
+
+    fields = ('request_id', 'method', 'route', 'status', 'duration_ms',
+              'fingerprint', 'statement', 'parameters', 'plan')
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.fields:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach request fields on the request thread and drop INFO records of
+    requests that were not sampled. Runs before the record is queued."""
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        record.request_id = g.get('request_id')
+        record.method = request.method
+        record.route = request.endpoint
+        return record.levelno > logging.INFO or g.get('log_sampled', True)
+
+
+def configure_logging(config):
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if config['LOG_FILE']:
+        handlers.append(RotatingFileHandler(
+            config['LOG_FILE'], maxBytes=config['LOG_MAX_BYTES'], backupCount=config['LOG_BACKUP_COUNT']
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Request threads only put records on the queue; formatting and file or
+    # stream I/O happen on the listener thread.
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config['LOG_LEVEL'])
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def restart_listener():
+    """Start a new listener thread in a forked child process."""
+    global _listener
+    if _listener is not None:
+        _listener = QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def init_app(app):
+    configure_logging(app.config)
+    # Let app.logger propagate to the queue instead of writing to stderr.
+    app.logger.removeHandler(default_handler)
+
+    sample_rate = app.config['LOG_SAMPLE_RATE']
+
+    @app.before_request
+    def start_request_log():
+        g.request_started = time.perf_counter()
+        request_id = request.headers.get('X-Request-ID', '')
+        g.request_id = request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+        g.log_sampled = sample_rate >= 1 or random.random() < sample_rate
+
+    @app.after_request
+    def log_request(response):
+        if 'request_started' not in g:
+            return response
+        response.headers['X-Request-ID'] = g.request_id
+        duration_ms = round((time.perf_counter() - g.request_started) * 1000, 2)
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        access_logger.log(level, '%s %s', request.method, request.path,
+                          extra={'status': response.status_code, 'duration_ms': duration_ms})
+        return response
@@ -0,0 +1,169 @@
+import re
+import click
+from flask.cli import AppGroup, with_appcontext
+from markupsafe import escape
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app.models import db
+
+search_cli = AppGroup('search', help='Manage the product full-text index.')
+
+# Highlight markers that cannot occur in product text; the matched terms are
+# wrapped in <mark> only after the rest has been HTML-escaped.
+START, STOP = '\x02', '\x03'
+
+POSTGRES_DDL = [
+    # Name matches weigh more than description matches.
+    """
+    ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS ix_product_search_vector ON product USING GIN (search_vector)',
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        name, description, content='product', content_rowid='product_id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts (product_fts, rowid, name, description)
+        VALUES ('delete', old.product_id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, description ON product BEGIN
+        INSERT INTO product_fts (product_fts, rowid, name, description)
+        VALUES ('delete', old.product_id, old.name, old.description);
+        INSERT INTO product_fts (rowid, name, description) VALUES (new.product_id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO product_fts (product_fts) VALUES ('rebuild')",
+]
+
+# Rank and count on the index first, then build headlines for one page only;
+# ts_headline re-parses the whole document and is the expensive part.
+POSTGRES_SEARCH = text(f"""
+    WITH query AS (SELECT websearch_to_tsquery('english', :q) AS tsquery),
+    page AS (
+        SELECT p.product_id, ts_rank_cd(p.search_vector, query.tsquery) AS rank, count(*) OVER () AS total
+        FROM product p, query
+        WHERE p.search_vector @@ query.tsquery
+        ORDER BY rank DESC, p.product_id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT p.product_id, p.name, p.price, p.image_url, page.rank, page.total,
+        ts_headline('english', p.name, query.tsquery,
+                    'StartSel={START}, StopSel={STOP}, HighlightAll=true') AS name_highlight,
+        ts_headline('english', coalesce(p.description, ''), query.tsquery,
+                    'StartSel={START}, StopSel={STOP}, MaxFragments=2, MinWords=5, MaxWords=20') AS description_highlight
+    FROM page JOIN product p ON p.product_id = page.product_id, query
+    ORDER BY page.rank DESC, p.product_id
+""")
+
+# FTS5 ranking and highlight functions cannot share a SELECT with a window
+# function, so the page is ranked in a subquery first.
+SQLITE_SEARCH = text(f"""
+    WITH page AS (
+        SELECT m.product_id, m.score, count(*) OVER () AS total
+        FROM (
+            SELECT rowid AS product_id, bm25(product_fts, 4.0, 1.0) AS score
+            FROM product_fts WHERE product_fts MATCH :q
+        ) m
+        ORDER BY m.score, m.product_id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT p.product_id, p.name, p.price, p.image_url, -page.score AS rank, page.total,
+        highlight(product_fts, 0, '{START}', '{STOP}') AS name_highlight,
+        snippet(product_fts, 1, '{START}', '{STOP}', '...', 20) AS description_highlight
+    FROM page
+    JOIN product_fts ON product_fts.rowid = page.product_id
+    JOIN product p ON p.product_id = page.product_id
+    WHERE product_fts MATCH :q
+    ORDER BY page.score, p.product_id
+""")
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def fts5_query(q):
+    """Turn free text into an FTS5 query that cannot be a syntax error:
+    every word must match, the last one as a prefix."""
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words[:-1]) + (' ' if len(words) > 1 else '') + f'"{words[-1]}"*'
+
+
+def highlight(value):
+    return str(escape(value or '')).replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def search_products(q, page, per_page):
+    """Return ``(rows, total)`` for one page of ranked matches."""
+    dialect = db.engine.dialect.name
+    params = {'limit': per_page, 'offset': (page - 1) * per_page}
+    if dialect == 'postgresql':
+        statement, params['q'] = POSTGRES_SEARCH, q
+    elif dialect == 'sqlite':
+        statement, params['q'] = SQLITE_SEARCH, fts5_query(q)
+        if params['q'] is None:
+            return [], 0
+    else:
+        raise SearchUnavailable(f'Full-text search is not supported on {dialect}')
+
+    try:
+        rows = db.session.execute(statement, params).all()
+    except (OperationalError, ProgrammingError) as exc:
+        db.session.rollback()
+        raise SearchUnavailable('The product search index is missing; run `flask search init`') from exc
+
+    results = [
+        {
+            'id': row.product_id,
+            'name': row.name,
+            'price': row.price,
+            'image_url': row.image_url,
+            'rank': round(row.rank, 4),
+            'name_highlight': highlight(row.name_highlight),
+            'description_highlight': highlight(row.description_highlight),
+        }
+        for row in rows
+    ]
+    return results, rows[0].total if rows else 0
+
+
+@search_cli.command('init')
+@with_appcontext
+def init_command():
+    """Create the full-text index for the current database.
+
+    Safe to run again. On Postgres the generated column rewrites the
+    product table once, under an exclusive lock.
+    """
+    dialect = db.engine.dialect.name
+    statements = {'postgresql': POSTGRES_DDL, 'sqlite': SQLITE_DDL}.get(dialect)
+    if statements is None:
+        raise click.ClickException(f'Full-text search is not supported on {dialect}')
+    with db.engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    click.echo(f'Product search index ready ({dialect})')
+
+
+def init_app(app):
+    app.cli.add_command(search_cli)
@@ -0,0 +1,248 @@
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+from werkzeug.security import generate_password_hash
+from app import analytics, typeahead
+from app import size_options as size_option_table
+from app.models import db, User, Product, NailSizeOption, Cart, CartItem, Order, OrderItem
+
+# Generated timestamps fall in the year before this date, so the same seed
+# always produces the same rows.
+REFERENCE_DATE = datetime(2024, 6, 1)
+
+COLORS = ['blush', 'crimson', 'lilac', 'sage', 'ivory', 'midnight', 'coral', 'champagne', 'cobalt', 'mocha', 'rose gold', 'emerald']
+FINISHES = ['glossy', 'matte', 'chrome', 'glitter', 'velvet', 'jelly', 'holographic', 'pearl']
+STYLES = ['french tip', 'ombre', 'marble', 'floral', 'abstract', 'tortoiseshell', 'starry', 'swirl', 'checkered', 'minimalist']
+SHAPES = ['almond', 'coffin', 'square', 'stiletto', 'oval', 'squoval']
+LENGTHS = ['short', 'medium', 'long', 'extra long']
+SIZE_NAMES = ['XS', 'S', 'M', 'L', 'XL', 'Custom']
+STATUSES = ['Processing'] * 2 + ['Updating order'] + ['Paid'] * 6 + ['Shipped'] * 8 + ['Cancelled']
+FIRST_NAMES = ['Ava', 'Mia', 'Zoe', 'Lea', 'Ana', 'Ivy', 'Noa', 'Eva', 'Kim', 'Sam', 'Ari', 'Jo']
+LAST_NAMES = ['Nguyen', 'Garcia', 'Smith', 'Kim', 'Rossi', 'Silva', 'Khan', 'Novak', 'Okafor', 'Lee']
+CITIES = [('Austin', 'TX'), ('Denver', 'CO'), ('Seattle', 'WA'), ('Boston', 'MA'), ('Miami', 'FL'), ('Chicago', 'IL')]
+
+
+def _mix(*values):
+    """A fast, stable 64-bit hash (splitmix64) for per-row derived values."""
+    x = 0
+    for value in values:
+        x = (x + value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        x ^= x >> 31
+    return x
+
+
+def _price(seed, product_id):
+    return round(8 + _mix(seed, 1, product_id) % 4200 / 100, 2)
+
+
+def _timestamp(rng):
+    return REFERENCE_DATE - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def _lines(seed, kind, owner_id, average, ids):
+    """The (product_id, quantity, size_option_id) lines of a cart or order.
+
+    Derived from the owner id alone, so the parent row's total and its item
+    rows can be generated in separate passes without holding either.
+    """
+    rng = random.Random(_mix(seed, kind, owner_id))
+    count = rng.randint(1, max(1, 2 * average - 1))
+    return [
+        (rng.choice(ids['products']), rng.choice((1, 1, 1, 2, 3)), rng.choice(ids['size_options']))
+        for _ in range(count)
+    ]
+
+
+def _next_id(column):
+    return (db.session.scalar(select(func.max(column))) or 0) + 1
+
+
+def _load(connection, table, columns, rows, batch_size):
+    """Stream ``rows`` into ``table`` in batches of ``batch_size``.
+
+    Postgres gets one COPY per batch; other databases an executemany.
+    Only one batch is held in memory at a time.
+    """
+    postgres = connection.dialect.name == 'postgresql'
+    cursor = connection.connection.cursor() if postgres else None
+    copy_sql = f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    insert = table.insert()
+    total = 0
+    batch = []
+
+    def flush():
+        if postgres:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+        else:
+            connection.execute(insert, [dict(zip(columns, row)) for row in batch])
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    return total
+
+
+def _reset_sequence(connection, table, column):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', '{column}'), "
+            f"(SELECT COALESCE(MAX({column}), 1) FROM \"{table}\"))"
+        ))
+
+
+@click.command('seed')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--products', default=500, show_default=True)
+@click.option('--size-options', default=len(SIZE_NAMES), show_default=True)
+@click.option('--carts', default=200, show_default=True, help='Users that get a cart.')
+@click.option('--cart-items', default=3, show_default=True, help='Average items per cart.')
+@click.option('--orders', default=2000, show_default=True)
+@click.option('--items-per-order', default=3, show_default=True, help='Average items per order.')
+@click.option('--seed', 'seed', default=42, show_default=True, help='Same seed, same data.')
+@click.option('--batch-size', default=10000, show_default=True)
+@click.option('--password', default='password', show_default=True, help='Password of every generated user.')
+@with_appcontext
+def seed_command(users, products, size_options, carts, cart_items, orders, items_per_order, seed, batch_size, password):
+    """Bulk-generate synthetic users, products, carts and orders.
+
+    Rows are appended after the current maximum ids and streamed in
+    batches, so memory use does not grow with the row counts. Carts and
+    orders reference the users and products generated in the same run.
+    """
+    if (carts or orders) and not (users and products and size_options):
+        raise click.ClickException('Carts and orders need --users, --products and --size-options above 0')
+    if carts > users:
+        raise click.ClickException('--carts cannot exceed --users')
+
+    first = {
+        'user': _next_id(User.user_id),
+        'product': _next_id(Product.product_id),
+        'size_option': _next_id(NailSizeOption.nail_size_option_id),
+        'cart': _next_id(Cart.cart_id),
+        'cart_item': _next_id(CartItem.cart_item_id),
+        'order': _next_id(Order.order_id),
+        'order_item': _next_id(OrderItem.order_item_id),
+    }
+    ids = {
+        'users': range(first['user'], first['user'] + users),
+        'products': range(first['product'], first['product'] + products),
+        'size_options': range(first['size_option'], first['size_option'] + size_options),
+    }
+    db.session.rollback()
+    # Hashing is deliberately slow; every generated user shares one hash.
+    password_hash = generate_password_hash(password)
+
+    def size_option_rows():
+        for index, option_id in enumerate(ids['size_options']):
+            name = SIZE_NAMES[index % len(SIZE_NAMES)]
+            if index >= len(SIZE_NAMES):
+                name = f'{name} {index // len(SIZE_NAMES) + 1}'
+            yield option_id, name, f'{name} press-on nail set'
+
+    def user_rows():
+        for user_id in ids['users']:
+            yield user_id, f'user{user_id}', f'user{user_id}@example.com', password_hash, None
+
+    def product_rows():
+        rng = random.Random(_mix(seed, 2))
+        for product_id in ids['products']:
+            color, finish, style = rng.choice(COLORS), rng.choice(FINISHES), rng.choice(STYLES)
+            shape, length = rng.choice(SHAPES), rng.choice(LENGTHS)
+            name = f'{color.title()} {finish} {style} set'
+            description = (
+                f'{length.capitalize()} {shape} press-on nails in {color} with a {finish} finish and '
+                f'{style} details. Reusable, salon quality, 24 nails per set.'
+            )
+            yield (product_id, name, description, _price(seed, product_id), rng.randint(0, 500),
+                   f'https://example.com/nails/{product_id}.jpg')
+
+    def cart_rows():
+        for offset in range(carts):
+            cart_id = first['cart'] + offset
+            lines = _lines(seed, 3, cart_id, cart_items, ids)
+            total = round(sum(_price(seed, product_id) * quantity for product_id, quantity, _ in lines), 2)
+            yield cart_id, ids['users'][offset], total
+
+    def cart_item_rows():
+        cart_item_id = first['cart_item']
+        for offset in range(carts):
+            cart_id = first['cart'] + offset
+            for product_id, quantity, size_option_id in _lines(seed, 3, cart_id, cart_items, ids):
+                yield (cart_item_id, cart_id, product_id, quantity, _price(seed, product_id), size_option_id,
+                       None, None)
+                cart_item_id += 1
+
+    def order_rows():
+        rng = random.Random(_mix(seed, 4))
+        for order_id in range(first['order'], first['order'] + orders):
+            lines = _lines(seed, 5, order_id, items_per_order, ids)
+            total = round(sum(_price(seed, product_id) * quantity for product_id, quantity, _ in lines), 2)
+            city, state = rng.choice(CITIES)
+            yield (order_id, rng.choice(ids['users']), rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                   f'{rng.randint(1, 9999)} Main St', city, state, 'US', f'{rng.randint(10000, 99999)}',
+                   total, rng.choice(STATUSES), _timestamp(rng))
+
+    def order_item_rows():
+        order_item_id = first['order_item']
+        for order_id in range(first['order'], first['order'] + orders):
+            for product_id, quantity, size_option_id in _lines(seed, 5, order_id, items_per_order, ids):
+                yield (order_item_id, order_id, product_id, quantity, _price(seed, product_id), size_option_id,
+                       None, None)
+                order_item_id += 1
+
+    item_columns = ['product_id', 'quantity', 'unit_price', 'nail_size_option_id',
+                    'left_hand_custom_size', 'right_hand_custom_size']
+    plan = [
+        (NailSizeOption, 'nail_size_option_id', ['nail_size_option_id', 'name', 'description'], size_option_rows),
+        (User, 'user_id', ['user_id', 'username', 'email', 'password', 'avatar_image'], user_rows),
+        (Product, 'product_id',
+         ['product_id', 'name', 'description', 'price', 'quantity_available', 'image_url'], product_rows),
+        (Cart, 'cart_id', ['cart_id', 'user_id', 'total_amount'], cart_rows),
+        (CartItem, 'cart_item_id', ['cart_item_id', 'cart_id'] + item_columns, cart_item_rows),
+        (Order, 'order_id',
+         ['order_id', 'user_id', 'first_name', 'last_name', 'street_address', 'city', 'state', 'country',
+          'postal_code', 'total_amount', 'status', 'created_at'], order_rows),
+        (OrderItem, 'order_item_id', ['order_item_id', 'order_id'] + item_columns, order_item_rows),
+    ]
+
+    with db.engine.begin() as connection:
+        for model, id_column, columns, rows in plan:
+            table = model.__table__
+            started = time.perf_counter()
+            count = _load(connection, table, columns, rows(), batch_size)
+            if count:
+                _reset_sequence(connection, table.name, id_column)
+            elapsed = time.perf_counter() - started
+            click.echo(f'{table.name:<18} {count:>10} rows in {elapsed:6.1f}s'
+                       f' ({count / elapsed if elapsed else 0:,.0f} rows/s)')
+    if orders:
+        # Seeded orders bypass the payment webhook that keeps the reports'
+        # daily rollups current.
+        started = time.perf_counter()
+        written = analytics.rebuild()
+        click.echo(f'{"sales rollups":<18} {sum(written.values()):>10} rows in '
+                   f'{time.perf_counter() - started:6.1f}s')
+    if products:
+        typeahead.products_changed()
+    if size_options:
+        size_option_table.options_changed()
+
+
+def init_app(app):
+    app.cli.add_command(seed_command)
@@ -0,0 +1,198 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.sessions import SessionInterface, SessionMixin
+
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file shared by every worker on the host.
+
+    Expired rows are ignored on read and deleted by a background thread every
+    ``cleanup_interval`` seconds.
+    """
+
+    def __init__(self, path, cleanup_interval):
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._cleanup_pid = None
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @property
+    def _conn(self):
+        # sqlite3 connections must not cross threads, and the one opened by a
+        # preloaded master must not be reused after a fork.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        self._ensure_cleanup()
+        return conn
+
+    def get(self, sid):
+        row = self._conn.execute(
+            'SELECT data FROM sessions WHERE sid = ? AND expires > ?', (sid, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid, data, ttl):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+            (sid, json.dumps(data), time.time() + ttl)
+        )
+
+    def delete(self, sid):
+        self._conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def delete_expired(self):
+        self._conn.execute('DELETE FROM sessions WHERE expires <= ?', (time.time(),))
+
+    def _ensure_cleanup(self):
+        # One cleanup thread per process, started on first use so it also
+        # exists in forked workers.
+        if self._cleanup_pid == os.getpid():
+            return
+        with self._lock:
+            if self._cleanup_pid == os.getpid():
+                return
+            self._cleanup_pid = os.getpid()
+            threading.Thread(target=self._cleanup_loop, name='session-cleanup', daemon=True).start()
+
+    def _cleanup_loop(self):
+        while True:
+            time.sleep(self.cleanup_interval)
+            try:
+                self.delete_expired()
+            except sqlite3.Error:
+                pass
+
+
+class RedisSessionStore:
+    """Sessions in Redis; expiry is left to Redis key TTLs."""
+
+    def __init__(self, url, prefix='session:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        data = self.client.get(self.prefix + sid)
+        return json.loads(data) if data else None
+
+    def set(self, sid, data, ttl):
+        self.client.setex(self.prefix + sid, ttl, json.dumps(data))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+class ServerSession(SessionMixin):
+    """A session that reads the store only when a view first touches it.
+
+    Requests that never use ``session`` cost no store I/O and set no cookie.
+    """
+
+    def __init__(self, interface, sid):
+        self.interface = interface
+        self.sid = sid
+        self.modified = False
+        self.accessed = False
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self.accessed = True
+            stored = self.interface.store.get(self.sid) if self.sid else None
+            if stored is None:
+                # Never adopt an unknown or expired id from the client.
+                self.sid = None
+            self._data = stored or {}
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keep session data server side and only an opaque id in the cookie."""
+
+    def __init__(self, app):
+        self.app = app
+        self._store = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    config = self.app.config
+                    if config['SESSION_REDIS_URL']:
+                        self._store = RedisSessionStore(config['SESSION_REDIS_URL'])
+                    else:
+                        self._store = SQLiteSessionStore(config['SESSION_SQLITE_PATH'], config['SESSION_CLEANUP_INTERVAL'])
+        return self._store
+
+    def open_session(self, app, request):
+        return ServerSession(self, request.cookies.get(self.get_cookie_name(app)))
+
+    def save_session(self, app, session, response):
+        if not session.accessed:
+            return
+        response.vary.add('Cookie')
+        if not session.modified:
+            return
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session.data:
+            if session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        ttl = app.config['SESSION_TTL']
+        sid = session.sid or secrets.token_urlsafe(32)
+        self.store.set(sid, session.data, ttl)
+        response.set_cookie(
+            name, sid, max_age=ttl, domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def init_app(app):
+    app.session_interface = ServerSessionInterface(app)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from flask import current_app
+from app.extensions import cache, cache_is_shared
+from app.models import db, NailSizeOption
+
+VERSION_KEY = 'size_options_version'
+# Least time between reloads caused by lookups of unknown ids.
+MISS_RELOAD_SECONDS = 1.0
+
+
+class SizeOptionTable:
+    """Every NailSizeOption of the process, as plain dicts by id, plus the
+    listing and its ETag, all computed once per load."""
+
+    def __init__(self):
+        self.options = {}
+        self.listing = []
+        self.etag = None
+        self.version = None
+        self.loaded = False
+        self.checked_at = 0.0
+        self.missed_at = 0.0
+        self.lock = threading.Lock()
+
+    def load(self, version):
+        rows = db.session.execute(
+            db.select(NailSizeOption.nail_size_option_id, NailSizeOption.name, NailSizeOption.description)
+            .order_by(NailSizeOption.nail_size_option_id)
+        ).all()
+        listing = [{'id': row.nail_size_option_id, 'name': row.name, 'description': row.description} for row in rows]
+        etag = hashlib.sha1(json.dumps(listing, sort_keys=True).encode()).hexdigest()
+        with self.lock:
+            self.options = {option['id']: option for option in listing}
+            self.listing, self.etag, self.version = listing, etag, version
+            self.loaded = True
+
+
+def get_table():
+    """The process table, reloaded when the shared version changed.
+
+    The version in the cache is checked at most once every
+    ``SIZE_OPTIONS_REFRESH_SECONDS``; between checks lookups touch neither
+    the cache nor the database. Without a shared cache other processes'
+    changes cannot be seen, so the table is reloaded on every check instead.
+    """
+    table = current_app.extensions['size_options']
+    now = time.monotonic()
+    if table.loaded and now - table.checked_at < current_app.config['SIZE_OPTIONS_REFRESH_SECONDS']:
+        return table
+    table.checked_at = now
+    shared = cache_is_shared()
+    version = cache.get(VERSION_KEY) if shared else None
+    if not table.loaded or not shared or version != table.version:
+        table.load(version)
+    return table
+
+
+def get(option_id):
+    """The option with ``option_id`` as a dict, or None."""
+    table = get_table()
+    option = table.options.get(option_id)
+    now = time.monotonic()
+    if option is None and option_id is not None and now - table.missed_at >= MISS_RELOAD_SECONDS:
+        # Possibly created by another process since the last check. Unknown
+        # ids reload at most once per MISS_RELOAD_SECONDS.
+        table.missed_at = now
+        table.load(cache.get(VERSION_KEY) if cache_is_shared() else None)
+        option = table.options.get(option_id)
+    return option
+
+
+def name(option_id):
+    option = get(option_id)
+    return option['name'] if option else None
+
+
+def options_changed():
+    """Call after writing size options; every process reloads on its next
+    version check, this one immediately."""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, timeout=0)
+    table = current_app.extensions['size_options']
+    table.load(version)
+    table.checked_at = time.monotonic()
+
+
+def init_app(app):
+    app.extensions['size_options'] = SizeOptionTable()
+    # Email templates look sizes up by id instead of loading the relationship.
+    app.jinja_env.globals['size_option_name'] = name
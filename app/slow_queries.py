@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from sqlalchemy import event
+from app import metrics
+
+logger = logging.getLogger('app.slow_query')
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\?|(?<!:):\w+|\$\d+')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Per-process totals by fingerprint; /metrics has the cross-worker view.
+_stats = {}
+_stats_lock = threading.Lock()
+_explained = set()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement):
+    """Reduce a statement to its shape: literals and bound parameters become
+    ``?`` and IN lists of any length collapse to ``(?+)``. Returns the
+    normalized text and a short stable id for it."""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('(?+)', shape)
+    shape = _WHITESPACE.sub(' ', shape).strip()
+    return shape, hashlib.sha1(shape.encode()).hexdigest()[:12]
+
+
+def redact(parameters):
+    """Keep the parameter types, never the values."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def statement_stats():
+    """Counts and timings by fingerprint for this process, slowest first."""
+    with _stats_lock:
+        rows = [dict(stats, fingerprint=key) for key, stats in _stats.items()]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def explain(cursor, dialect, statement, parameters):
+    """Plan ``statement`` without running it, on the same DBAPI connection.
+
+    Postgres aborts the whole transaction when a statement fails, so the
+    EXPLAIN runs inside a savepoint there.
+    """
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if dialect == 'postgresql':
+            explain_cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                explain_cursor.execute('EXPLAIN ' + statement, parameters)
+                plan = '\n'.join(row[0] for row in explain_cursor.fetchall())
+            except Exception:
+                explain_cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                raise
+            finally:
+                explain_cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        elif dialect == 'sqlite':
+            explain_cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            plan = '\n'.join(str(row[-1]) for row in explain_cursor.fetchall())
+        else:
+            return None
+    finally:
+        explain_cursor.close()
+    return plan
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context so a statement that raises cannot skew
+    # the timing of the next one on the same connection.
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def init_app(app):
+    """Fingerprint every statement and log the ones slower than
+    ``SLOW_QUERY_THRESHOLD_MS``, with an EXPLAIN plan for the first slow
+    occurrence of each fingerprint. A threshold of 0 turns this off."""
+    threshold_ms = app.config['SLOW_QUERY_THRESHOLD_MS']
+    if threshold_ms <= 0:
+        return
+    capture_plans = app.config['SLOW_QUERY_EXPLAIN']
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        elapsed_ms = elapsed * 1000
+        shape, key = fingerprint(statement)
+        slow = elapsed_ms >= threshold_ms
+
+        with _stats_lock:
+            stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = {'statement': shape, 'count': 0, 'slow': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            stats['count'] += 1
+            stats['slow'] += slow
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            first_slow = slow and key not in _explained
+            if first_slow:
+                _explained.add(key)
+        metrics.observe_statement(key, elapsed)
+
+        if not slow:
+            return
+        plan = None
+        if first_slow and capture_plans and not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                plan = explain(cursor, conn.dialect.name, statement, parameters)
+            except Exception:
+                logger.warning('Could not capture EXPLAIN for %s', key, exc_info=True)
+        logger.warning(
+            'Slow query %s took %.1f ms', key, elapsed_ms,
+            extra={
+                'fingerprint': key,
+                'duration_ms': round(elapsed_ms, 2),
+                'statement': statement,
+                'parameters': redact(parameters),
+                'plan': plan,
+            },
+        )
+
+    from app.models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,202 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left, insort
+from flask import current_app
+from app.extensions import cache, cache_is_shared
+from app.models import db, Product
+
+VERSION_KEY = 'typeahead_version'
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(value):
+    """Lowercase, drop accents and collapse punctuation to single spaces."""
+    value = unicodedata.normalize('NFKD', value.casefold())
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(_WORD.findall(value))
+
+
+class PrefixIndex:
+    """Product names in a sorted list of ``(key, product_id)`` pairs.
+
+    Every name is stored once per word it contains, starting at that word,
+    so "sage" finds "Sage ombre set" and "ombre" finds it too. A lookup is a
+    bisect to the first key with the prefix plus a bounded scan.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.names = {}
+        self.lengths = {}
+        self.lock = threading.Lock()
+        self.built = False
+        self.version = None
+        self.build_lock = threading.Lock()
+
+    @staticmethod
+    def keys(name):
+        words = normalize(name).split(' ')
+        return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+    def build(self, rows, version):
+        entries = sorted((key, product_id) for product_id, name in rows for key in self.keys(name))
+        names = {product_id: name for product_id, name in rows}
+        lengths = {product_id: len(normalize(name)) for product_id, name in rows}
+        with self.lock:
+            self.entries, self.names, self.lengths = entries, names, lengths
+            self.version = version
+            self.built = True
+
+    def add(self, product_id, name):
+        with self.lock:
+            self._remove(product_id)
+            self.names[product_id] = name
+            self.lengths[product_id] = len(normalize(name))
+            for key in self.keys(name):
+                insort(self.entries, (key, product_id))
+
+    def remove(self, product_id):
+        with self.lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        name = self.names.pop(product_id, None)
+        if name is None:
+            return
+        del self.lengths[product_id]
+        for key in self.keys(name):
+            index = bisect_left(self.entries, (key, product_id))
+            if index < len(self.entries) and self.entries[index] == (key, product_id):
+                del self.entries[index]
+
+    def suggest(self, q, limit, scan=200):
+        """Up to ``limit`` ``(product_id, name)`` pairs whose name, or a word
+        in it, starts with ``q``. Names that start with ``q`` come first."""
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        matches = {}
+        with self.lock:
+            index = bisect_left(self.entries, (prefix,))
+            for key, product_id in self.entries[index:index + scan]:
+                if not key.startswith(prefix):
+                    break
+                name = self.names[product_id]
+                whole_name = len(key) == self.lengths[product_id]
+                if product_id not in matches or whole_name:
+                    matches[product_id] = (not whole_name, len(name), name)
+        ranked = sorted(matches.items(), key=lambda item: item[1])
+        return [(product_id, name) for product_id, (_, _, name) in ranked[:limit]]
+
+
+def _index():
+    return current_app.extensions['typeahead']
+
+
+def _shared_version():
+    return cache.get(VERSION_KEY)
+
+
+def _current_version():
+    """What the index was built from: the shared version when the cache is
+    shared, otherwise a cheap probe of the product table. The probe misses a
+    rename to a name of the same length made in another process; this
+    process's own changes are applied directly."""
+    if cache_is_shared():
+        return _shared_version()
+    return tuple(db.session.execute(
+        db.select(db.func.count(), db.func.max(Product.product_id), db.func.sum(db.func.length(Product.name)))
+    ).one())
+
+
+def _rebuild(index, version=None):
+    version = _current_version() if version is None else version
+    rows = db.session.execute(db.select(Product.product_id, Product.name)).all()
+    index.build([(row.product_id, row.name) for row in rows], version)
+
+
+def refresh(index):
+    """Rebuild the index when products changed in another process."""
+    version = _current_version()
+    if not index.built or version != index.version:
+        _rebuild(index, version)
+
+
+def get_index():
+    """The process index. Keystrokes reach neither the cache nor the
+    database; a background thread builds the index when the worker starts
+    and keeps it current (see ``init_app``). Only a request that arrives
+    before that first build finishes builds it inline."""
+    index = _index()
+    if not index.built:
+        with index.build_lock:
+            if not index.built:
+                _rebuild(index)
+    return index
+
+
+def _start_refresher(app, index):
+    interval = app.config['TYPEAHEAD_REFRESH_SECONDS']
+
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    with index.build_lock:
+                        refresh(index)
+            except Exception:
+                app.logger.exception('Typeahead refresh failed')
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='typeahead-refresh', daemon=True).start()
+
+
+def _bump(index):
+    # Other processes rebuild on their next check. This one already has its
+    # own change and adopts the new version, unless it had also missed a
+    # change made elsewhere. Without a shared cache there is nobody to tell.
+    if not cache_is_shared():
+        return
+    up_to_date = _shared_version() == index.version
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, timeout=0)
+    if up_to_date:
+        index.version = version
+
+
+def product_saved(product):
+    index = _index()
+    if index.built:
+        index.add(product.product_id, product.name)
+    _bump(index)
+
+
+def product_deleted(product_id):
+    index = _index()
+    if index.built:
+        index.remove(product_id)
+    _bump(index)
+
+
+def products_changed():
+    """Call after bulk writes; every process rebuilds on its next check."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=0)
+
+
+def init_app(app):
+    """Keep a prefix index of product names in every worker. Each worker
+    builds it on startup in a background thread, which then checks every
+    TYPEAHEAD_REFRESH_SECONDS for changes made by other processes."""
+    index = app.extensions['typeahead'] = PrefixIndex()
+    started_in = []
+
+    @app.before_request
+    def ensure_refresher():
+        # Per process, so that forked workers get their own thread.
+        if not started_in or started_in[-1] != os.getpid():
+            started_in.append(os.getpid())
+            _start_refresher(app, index)
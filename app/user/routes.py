@@ -1,19 +1,88 @@
-from flask import request, jsonify, Blueprint
+import base64
+import json
+import sys
+from flask import request, jsonify, Blueprint, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token, get_jwt
+from sqlalchemy import and_, func, or_, select
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_cors import cross_origin
 from datetime import timedelta
+from app.auth import admin_required
 from app.models import db, User, TokenBlocklist
-from app import app
 
 user_blueprint = Blueprint("user", __name__, url_prefix="/user")
 
+# Never the password hash
+LISTED_COLUMNS = (User.user_id, User.username, User.email, User.avatar_image)
+SEARCH_FIELDS = ('username', 'email')
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    if not isinstance(values, list):
+        raise ValueError('malformed cursor')
+    return values
+
 
 @user_blueprint.route('/', methods=['GET'])
-@cross_origin()
+@admin_required
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_response() for user in users]), 200
+    """List users a page at a time, optionally by username or email prefix.
+
+    Pages are keyset-paginated: ``cursor`` is the ``next_cursor`` of the
+    previous page, so every page costs one index range scan however deep
+    it is.
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    q = request.args.get('q', '').strip().lower()
+    field = request.args.get('by', 'username')
+    if field not in SEARCH_FIELDS:
+        return jsonify({'message': f'by must be one of {", ".join(SEARCH_FIELDS)}'}), 400
+
+    query = select(*LISTED_COLUMNS)
+    if q:
+        # The range lets the lower() index serve the search whatever the
+        # collation; LIKE then keeps exact prefix matches only.
+        key = func.lower(getattr(User, field))
+        escaped = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.where(key >= q, key.like(escaped + '%', escape='\\'))
+        # No upper bound after the last code point; the LIKE alone decides.
+        if ord(q[-1]) < sys.maxunicode:
+            query = query.where(key < q[:-1] + chr(ord(q[-1]) + 1))
+        query = query.order_by(key, User.user_id)
+        query = query.add_columns(key.label('sort_key'))
+    else:
+        key = None
+        query = query.order_by(User.user_id)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            if key is None:
+                (last_id,) = values
+                query = query.where(User.user_id > int(last_id))
+            else:
+                last_key, last_id = values
+                query = query.where(or_(key > str(last_key), and_(key == str(last_key), User.user_id > int(last_id))))
+        except (ValueError, TypeError):
+            return jsonify({'message': 'Invalid cursor'}), 400
+
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [last.user_id] if key is None else [last.sort_key, last.user_id]
+        )
+    return jsonify({
+        'data': [{column.key: row._mapping[column.key] for column in LISTED_COLUMNS} for row in rows],
+        'next_cursor': next_cursor,
+    }), 200
 
 
 def authenticate_user(username, password):
@@ -23,7 +92,6 @@ def authenticate_user(username, password):
     return None
 
 @user_blueprint.route('/signup', methods=['POST'])
-@cross_origin()
 def signup():
     data = request.json
     username = data.get('username')
@@ -36,8 +104,8 @@ def signup():
     if User.query.filter_by(username=username).first():
         return jsonify({"message": "Username already exists"}), 409
 
-    hashed_password = generate_password_hash(password)
-    user = User(username=username, password=hashed_password, email=email)
+    # User() hashes the password itself
+    user = User(username=username, password=password, email=email)
     db.session.add(user)
     db.session.commit()
 
@@ -46,48 +114,44 @@ def signup():
 
 
 @user_blueprint.route('/login', methods=['POST'])
-@cross_origin(supports_credentials=True)
 def login():
-    app.logger.info("Login route called")
+    current_app.logger.info("Login route called")
     
     data = request.json
     if data is None:
-        app.logger.error("No data received")
+        current_app.logger.error("No data received")
         return jsonify({"message": "Invalid request"}), 400
     
     username = data.get('username')
     password = data.get('password')
     
-    app.logger.info(f"Username: {username}")
-    
     if not (username and password):
-        app.logger.error("Username and/or password not provided")
+        current_app.logger.error("Username and/or password not provided")
         return jsonify({"message": "Username and password are required"}), 400
 
     user = User.query.filter_by(username=username).first()
     if not user or not user.compare_password(password):
-        app.logger.error("Invalid credentials")
+        current_app.logger.error("Invalid credentials")
         return jsonify({"message": "Invalid credentials"}), 401
 
     # Create an access token with an expiration of 3 days
     access_token = create_access_token(identity=user.user_id, expires_delta=timedelta(days=3))
     refresh_token = create_refresh_token(identity=user.user_id)
 
-    app.logger.info(f"Access token created for user id: {user.user_id}")
+    current_app.logger.info(f"Access token created for user id: {user.user_id}")
 
     # Create response
     response = jsonify(message="Login successful", access_token=access_token)
     response.set_cookie('refresh_token', refresh_token, httponly=True, secure=True, samesite='None')
 
-    app.logger.info("Login successful")
+    current_app.logger.info("Login successful")
     return response, 200
 
 @user_blueprint.route('', methods=['GET'])
-@cross_origin(supports_credentials=True)
 @jwt_required()
 def get_user_identity():
     user_id = get_jwt_identity()
-    app.logger.info(f"Fetching user with ID: {user_id}")
+    current_app.logger.info(f"Fetching user with ID: {user_id}")
     user = User.query.get(user_id)
     if user:
         return jsonify({
@@ -101,19 +165,16 @@ def get_user_identity():
 
 
 @user_blueprint.route('/refresh', methods=['POST'])
-@cross_origin(supports_credentials=True)
 @jwt_required(refresh=True)
 def refresh():
     current_user = get_jwt_identity()
     access_token = create_access_token(identity=current_user, expires_delta=timedelta(days=3))
     response = jsonify(access_token=access_token)
-    response.headers['Access-Control-Allow-Credentials'] = 'true'
     return response, 200
 
 
 
 @user_blueprint.route('/protected', methods=['GET'])
-@cross_origin()
 @jwt_required()
 def protected():
     current_user_id = get_jwt_identity()
@@ -123,7 +184,6 @@ def protected():
 
 
 @user_blueprint.route('/update/<int:user_id>/username', methods=['PUT'])
-@cross_origin()
 @jwt_required()
 def update_username(user_id):
     current_user_id = get_jwt_identity()
@@ -147,7 +207,6 @@ def update_username(user_id):
     return jsonify({"message": "Username updated", "data": user.to_response()}), 200
 
 @user_blueprint.route('/update/<int:user_id>/password', methods=['PUT'])
-@cross_origin()
 @jwt_required()
 def update_password(user_id):
     current_user_id = get_jwt_identity()
@@ -172,7 +231,6 @@ def update_password(user_id):
     return jsonify({"message": "Password updated"}), 200
 
 @user_blueprint.route('/update/<int:user_id>/email', methods=['PUT'])
-@cross_origin()
 @jwt_required()
 def update_email(user_id):
     current_user_id = get_jwt_identity()
@@ -196,7 +254,6 @@ def update_email(user_id):
     return jsonify({"message": "Email updated"}), 200
 
 @user_blueprint.route('/update/<int:user_id>/avatar', methods=['PUT'])
-@cross_origin()
 @jwt_required()
 def update_avatar(user_id):
     current_user_id = get_jwt_identity()
@@ -220,7 +277,6 @@ def update_avatar(user_id):
     return jsonify({"message": "Avatar image updated"}), 200
 
 @user_blueprint.route('/get/<int:user_id>/avatar', methods=["GET"])
-@cross_origin()
 @jwt_required()
 def get_avatar_image(user_id):
     user = User.query.get(user_id)
@@ -233,7 +289,6 @@ def get_avatar_image(user_id):
         return jsonify({"message": "User not found"}), 404
 
 @user_blueprint.route('/update/<int:user_id>/all', methods=['PUT'])
-@cross_origin()
 @jwt_required()
 def update_user_info(user_id):
     current_user_id = get_jwt_identity()
@@ -266,7 +321,6 @@ def update_user_info(user_id):
     return jsonify({"message": "User information updated", "data": user.to_response()}), 200
 
 @user_blueprint.route('/logout', methods=["DELETE"])
-@cross_origin()
 @jwt_required(verify_type=False)
 def modify_token():
     token = get_jwt()
@@ -0,0 +1,118 @@
+"""Cart latency and SQL statements per request, database against cart store.
+
+Runs once per entry of ``--stores`` in a fresh interpreter (the store is
+chosen when the app is created): ``db`` keeps carts in the database only,
+``memory`` and ``redis`` set ``CART_STORE``. Each run adds ``--items``
+products to a cart, then times ``--rounds`` cart reads and adds, and for the
+store modes waits for the flusher and checks that ``cart_item`` caught up.
+``redis`` needs a server at ``CART_REDIS_URL``.
+
+    python benchmarks/cart_store.py --stores db,memory --rounds 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from support import access_token, bench_env, build_app, percentile, seed
+
+HEADERS = {'X-Forwarded-Proto': 'https'}
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self.lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self.increment)
+
+    def increment(self, *args):
+        with self.lock:
+            self.count += 1
+
+    def take(self):
+        with self.lock:
+            count, self.count = self.count, 0
+        return count
+
+
+def run(store, args):
+    env = bench_env(METRICS_ENABLED='false', LOG_LEVEL='WARNING', CART_FLUSH_INTERVAL='1')
+    if store != 'db':
+        env['CART_STORE'] = store
+    app = build_app(env)
+    ids = seed(app, users=1, products=max(args.items, 2))
+    headers = dict(HEADERS, Authorization=f'Bearer {access_token(app, ids["users"][0])}')
+    client = app.test_client()
+    size = ids['size_options'][0]
+
+    def add(product_id):
+        response = client.post('/cart/add_to_cart', headers=headers,
+                               json={'product_id': product_id, 'quantity': 1, 'nail_size_option_id': size})
+        assert response.status_code == 200, response.get_json()
+
+    for product_id in ids['products'][:args.items]:
+        add(product_id)
+    client.get('/cart/read', headers=headers)
+
+    from app.models import db, CartItem
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+    results = []
+    for name, call in (('read', lambda: client.get('/cart/read', headers=headers)),
+                       ('add', lambda: add(ids['products'][0]))):
+        latencies = []
+        counter.take()
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+        statements = counter.take() / args.rounds
+        results.append((name, latencies, statements))
+
+    for name, latencies, statements in results:
+        print(f'{store:<7} {name:<5} {percentile(latencies, 50) * 1000:>8.3f} {percentile(latencies, 99) * 1000:>8.3f} '
+              f'{statements:>10.1f}')
+
+    if store != 'db':
+        expected = args.items + args.rounds
+        deadline = time.monotonic() + 10
+        quantity = None
+        while time.monotonic() < deadline:
+            with app.app_context():
+                quantity = db.session.scalar(db.select(db.func.sum(CartItem.quantity)))
+            if quantity == expected:
+                break
+            time.sleep(0.2)
+        print(f'{store:<7} flush cart_item quantity {quantity} of {expected}')
+        if quantity != expected:
+            return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stores', default='db,memory')
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=500)
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        return run(args.run, args)
+
+    print(f'{"store":<7} {"call":<5} {"p50 ms":>8} {"p99 ms":>8} {"SQL/call":>10}')
+    status = 0
+    for store in args.stores.split(','):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', store,
+                               '--items', str(args.items), '--rounds', str(args.rounds)])
+        status = status or proc.returncode
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
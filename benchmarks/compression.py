@@ -0,0 +1,62 @@
+"""CPU cost against bytes saved when compressing ``/product/read_all``.
+
+Seeds ``--products`` products, fetches the catalog once uncompressed, then
+for each encoding and level reports the compressed size and the time to
+compress that payload, followed by whole-request latency through the app
+with each ``Accept-Encoding``. Brotli rows are skipped unless the Brotli
+package is installed.
+
+    python benchmarks/compression.py --products 500 --rounds 200
+"""
+import argparse
+import gzip
+import time
+
+from support import bench_env, build_app, seed
+
+HEADERS = {'X-Forwarded-Proto': 'https'}
+
+
+def timed(function, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = function()
+    return (time.perf_counter() - started) / rounds, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    app = build_app(bench_env(METRICS_ENABLED='false', LOG_LEVEL='WARNING'))
+    seed(app, users=0, products=args.products)
+    from app.compression import brotli
+
+    client = app.test_client()
+    payload = client.get('/product/read_all', headers=dict(HEADERS, **{'Accept-Encoding': 'identity'})).data
+    print(f'/product/read_all with {args.products} products: {len(payload):,} bytes\n')
+
+    candidates = [(f'gzip -{level}', lambda level=level: gzip.compress(payload, compresslevel=level, mtime=0))
+                  for level in (1, 6, 9)]
+    if brotli is not None:
+        candidates += [(f'br q{quality}', lambda quality=quality: brotli.compress(payload, quality=quality))
+                       for quality in (1, 4, 11)]
+    print(f'{"encoding":<10} {"bytes":>10} {"ratio":>7} {"ms":>8} {"MB/s":>8}')
+    for name, compress in candidates:
+        seconds, compressed = timed(compress, args.rounds)
+        print(f'{name:<10} {len(compressed):>10,} {len(payload) / len(compressed):>7.1f} {seconds * 1000:>8.3f} '
+              f'{len(payload) / seconds / 1e6:>8.1f}')
+
+    print(f'\n{"Accept-Encoding":<16} {"bytes":>10} {"ms/request":>11}')
+    for accept in ('identity', 'gzip', 'br, gzip'):
+        if accept.startswith('br') and brotli is None:
+            continue
+        headers = dict(HEADERS, **{'Accept-Encoding': accept})
+        seconds, response = timed(lambda: client.get('/product/read_all', headers=headers), args.rounds)
+        print(f'{accept:<16} {len(response.data):>10,} {seconds * 1000:>11.3f}')
+
+
+if __name__ == '__main__':
+    main()
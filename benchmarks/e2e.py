@@ -0,0 +1,188 @@
+"""End-to-end flows with latency percentiles and SQL query budgets.
+
+Seeds a catalog, then has ``--users`` shoppers each sign up, log in,
+browse, fill a cart with ``--cart-items`` products, read it back, place a
+preliminary order, open a Stripe checkout session, send the order emails and
+read the order. Stripe is a local fake and SMTP sending is suppressed.
+
+Requests go through the Flask test client in this process, so the SQL
+statements of each request can be counted. The suite exits with status 1
+when any endpoint issues more statements than its entry in ``BUDGETS``. The
+budgets do not depend on the cart size, so an N+1 query fails the run.
+
+Runs against SQLite by default; set ``BENCH_DATABASE_URL`` for Postgres.
+
+    python benchmarks/e2e.py --users 20 --cart-items 5 --threads 4
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from support import FakeStripe, bench_env, build_app, percentile, seed
+
+# Maximum SQL statements per request, writes included. add_to_cart creates
+# the cart on a user's first call.
+BUDGETS = {
+    'signup': 2,
+    'login': 1,
+    'read_all': 1,
+    'add_to_cart': 7,
+    'read_cart': 2,
+    'create_preliminary_order': 4,
+    'create_checkout_session': 1,
+    'send_emails': 3,
+    'read_order': 3,
+    'delete_all_items': 2,
+}
+
+HEADERS = {'X-Forwarded-Proto': 'https'}
+
+
+class QueryCounter:
+    """Counts statements per thread; the test client runs each request on
+    the calling thread."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self.count)
+
+    def count(self, *args):
+        self.local.queries = getattr(self.local, 'queries', 0) + 1
+
+    def reset(self):
+        self.local.queries = 0
+
+    @property
+    def queries(self):
+        return getattr(self.local, 'queries', 0)
+
+
+class Recorder:
+    def __init__(self, client, counter):
+        self.client = client
+        self.counter = counter
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def call(self, name, method, path, token=None, json=None, expect=200):
+        headers = dict(HEADERS)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        self.counter.reset()
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, headers=headers, json=json)
+        elapsed = time.perf_counter() - started
+        queries = self.counter.queries
+        if response.status_code != expect:
+            raise RuntimeError(f'{name}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}')
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            self.queries[name] = max(self.queries[name], queries)
+        return response.get_json()
+
+
+def shopper(recorder, index, ids, cart_items, iterations):
+    username = f'shopper{index}'
+    password = f'password-{index}'
+    recorder.call('signup', 'POST', '/user/signup', json={
+        'username': username, 'password': password, 'email': f'{username}@example.com',
+    }, expect=201)
+    token = recorder.call('login', 'POST', '/user/login', json={'username': username, 'password': password})['access_token']
+    user_id = int(recorder.call('debug_token', 'GET', '/debug-token', token)['current_user_id'])
+
+    products = ids['products']
+    for iteration in range(iterations):
+        recorder.call('read_all', 'GET', '/product/read_all')
+        for item in range(cart_items):
+            recorder.call('add_to_cart', 'POST', '/cart/add_to_cart', token, json={
+                'product_id': products[(index + iteration + item) % len(products)],
+                'quantity': 1,
+                'nail_size_option_id': ids['size_options'][item % len(ids['size_options'])],
+            })
+        cart = recorder.call('read_cart', 'GET', '/cart/read', token)
+        order_id = recorder.call('create_preliminary_order', 'POST', '/order/create_preliminary_order', token, json={
+            'total_amount': cart['total_price'],
+        }, expect=201)['order_id']
+        recorder.call('create_checkout_session', 'POST', '/create-checkout-session', token, json={'order_id': order_id})
+        recorder.call('send_emails', 'POST', '/send-emails', token, json={'user_id': user_id, 'order_id': order_id})
+        recorder.call('read_order', 'GET', f'/order/read/{order_id}', token)
+        recorder.call('delete_all_items', 'DELETE', '/cart/delete_all_items', token)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--cart-items', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=3, help='shopping rounds per user')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--stripe-latency-ms', type=float, default=0)
+    args = parser.parse_args(argv)
+
+    with FakeStripe(args.stripe_latency_ms) as stripe:
+        app = build_app(bench_env(
+            STRIPE_API_BASE=stripe.url,
+            MAIL_SUPPRESS_SEND='true',
+            METRICS_ENABLED='false',
+            LOG_LEVEL='WARNING',
+        ))
+        app.config['MAIL_SUPPRESS_SEND'] = True
+        ids = seed(app, users=0, products=args.products)
+
+        from app.models import db
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+        recorder = Recorder(app.test_client(), counter)
+        # Load the per-process size option table outside the measured calls.
+        recorder.client.get('/nail_sizes/', headers=HEADERS)
+
+        next_user = iter(range(args.users))
+        lock = threading.Lock()
+        failures = []
+
+        def worker():
+            while True:
+                with lock:
+                    index = next(next_user, None)
+                if index is None:
+                    return
+                try:
+                    shopper(recorder, index, ids, args.cart_items, args.iterations)
+                except Exception as exc:
+                    failures.append(f'shopper{index}: {exc}')
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in recorder.latencies.values())
+    print(f'{args.users} users x {args.iterations} rounds x {args.cart_items} cart items, '
+          f'{args.threads} threads: {total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)\n')
+    print(f'{"endpoint":<26} {"n":>5} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"budget":>7}')
+    violations = []
+    for name, values in recorder.latencies.items():
+        queries = recorder.queries[name]
+        budget = BUDGETS.get(name)
+        print(f'{name:<26} {len(values):>5} {percentile(values, 50) * 1000:>8.1f} {percentile(values, 95) * 1000:>8.1f} '
+              f'{percentile(values, 99) * 1000:>8.1f} {queries:>8} {"-" if budget is None else budget:>7}')
+        if budget is not None and queries > budget:
+            violations.append(f'{name} issued {queries} SQL statements, budget is {budget}')
+
+    for failure in failures:
+        print(f'FAILED {failure}', file=sys.stderr)
+    for violation in violations:
+        print(f'OVER BUDGET {violation}', file=sys.stderr)
+    return 1 if failures or violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Per-request cost of the security/CORS header layer.
+
+Compares a bare app with the previous stack (three Flask-CORS passes,
+Talisman and an after_request hook that rebuilt and printed a second CSP)
+and with ``app.headers``. The previous stack needs flask-cors and
+flask-talisman installed; it is skipped otherwise.
+
+    python benchmarks/header_overhead.py --requests 20000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from flask import Flask, jsonify
+from werkzeug.test import EnvironBuilder
+
+import support  # noqa: F401  (puts the repository on sys.path)
+from app import headers
+from config import Config
+
+ORIGIN = 'https://nail-shop.onrender.com'
+
+
+def bare_app():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({'ok': True})
+
+    return app
+
+
+def previous_stack():
+    from flask_cors import CORS
+    from flask_talisman import Talisman
+
+    app = bare_app()
+    CORS(app, supports_credentials=True, resources={r"/*": {"origins": ["https://localhost:3000", ORIGIN]}})
+    Talisman(app, content_security_policy=Config.CONTENT_SECURITY_POLICY)
+    CORS(app, resources={r"/*": {"origins": ["https://localhost:3000", ORIGIN]}})
+    CORS(app, resources={r"/*": {"origins": "*"}}, methods=["OPTIONS", "GET", "POST", "PUT", "DELETE"], supports_credentials=True)
+
+    @app.after_request
+    def set_csp_header(response):
+        csp = (
+            "default-src 'self'; "
+            "connect-src *; "
+            "frame-src 'self' https://js.stripe.com https://hooks.stripe.com https://connect-js.stripe.com https://checkout.stripe.com; "
+            "script-src 'self' 'unsafe-inline' https://js.stripe.com https://maps.googleapis.com https://connect-js.stripe.com https://checkout.stripe.com; "
+            "style-src 'self' 'unsafe-inline' sha256-0hAheEzaMe6uXIKV4EehS9pu1am1lj/KnnzrOYqckXk=; "
+            "img-src 'self' data: https://*.stripe.com; "
+            "report-uri /csp-report;"
+        )
+        print("Setting CSP header:", csp)
+        response.headers['Content-Security-Policy'] = csp
+        return response
+
+    return app
+
+
+def header_layer():
+    app = bare_app()
+    app.config.from_object(Config)
+    headers.init_app(app)
+    return app
+
+
+def measure(app, requests):
+    environ = EnvironBuilder(path='/ping', headers={'Origin': ORIGIN, 'X-Forwarded-Proto': 'https'}).get_environ()
+
+    def start_response(status, response_headers, exc_info=None):
+        pass
+
+    for _ in range(200):
+        b''.join(app(dict(environ), start_response))
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        b''.join(app(dict(environ), start_response))
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    stacks = [('bare app', bare_app)]
+    try:
+        import flask_cors, flask_talisman  # noqa: F401,E401
+        stacks.append(('previous stack', previous_stack))
+    except ImportError:
+        print('flask-cors/flask-talisman not installed; skipping the previous stack')
+    stacks.append(('header layer', header_layer))
+
+    results = []
+    # The previous stack prints on every response; keep that cost but not the noise.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, factory in stacks:
+            results.append((name, measure(factory(), args.requests)))
+
+    baseline = results[0][1]
+    print(f'{"stack":<16} {"us/request":>11} {"overhead us":>12}')
+    for name, per_request in results:
+        print(f'{name:<16} {per_request:>11.1f} {per_request - baseline:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
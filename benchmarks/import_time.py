@@ -0,0 +1,97 @@
+"""Worker startup benchmark.
+
+Runs ``create_app()`` in a fresh interpreter under ``python -X importtime``
+and fails when startup exceeds the budget or when an integration that
+should be imported lazily shows up during boot.
+
+    python benchmarks/import_time.py --runs 5 --budget-ms 600
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported by the routes that use them.
+LAZY_MODULES = (
+    'stripe',
+    'googleapiclient',
+    'google_auth_oauthlib',
+    'flask_mail',
+)
+
+BOOT_SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "from app import create_app; create_app(); "
+    "print('create_app_ms=%.3f' % ((time.perf_counter() - t) * 1000))"
+)
+
+
+def run_once(env):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SNIPPET],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit('create_app() failed in the benchmark subprocess')
+
+    imported = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        imported[name.strip()] = (int(self_us), int(cumulative_us))
+
+    boot_ms = next(
+        float(line.split('=', 1)[1]) for line in proc.stdout.splitlines()
+        if line.startswith('create_app_ms=')
+    )
+    return boot_ms, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 1200)))
+    parser.add_argument('--top', type=int, default=15, help='show the N slowest imports')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    env.setdefault('JWT_SECRET_KEY', 'benchmark')
+
+    timings = []
+    imported = {}
+    for _ in range(args.runs):
+        boot_ms, imported = run_once(env)
+        timings.append(boot_ms)
+
+    median = statistics.median(timings)
+    print(f'create_app() median {median:.1f} ms over {args.runs} runs '
+          f'(min {min(timings):.1f}, max {max(timings):.1f}, budget {args.budget_ms:.0f})')
+
+    slowest = sorted(imported.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    print(f'\n{"self ms":>9} {"cumul ms":>9}  module')
+    for name, (self_us, cumulative_us) in slowest:
+        print(f'{self_us / 1000:9.2f} {cumulative_us / 1000:9.2f}  {name}')
+
+    failures = []
+    eager = sorted(
+        name for name in imported
+        if name.split('.')[0] in LAZY_MODULES
+    )
+    if eager:
+        failures.append('imported during startup: ' + ', '.join(eager))
+    if median > args.budget_ms:
+        failures.append(f'startup {median:.1f} ms exceeds budget of {args.budget_ms:.0f} ms')
+
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
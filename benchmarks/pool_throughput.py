@@ -0,0 +1,93 @@
+"""Query throughput versus connection pool size.
+
+Runs a fixed number of client threads against the database for each pool
+size and reports queries per second and the time spent waiting for a
+pooled connection. Uses ``BENCH_DATABASE_URL`` (e.g. a local Postgres) or
+a temporary SQLite file.
+
+    python benchmarks/pool_throughput.py --threads 32 --pool-sizes 1,2,5,10,20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from config import engine_options  # noqa: E402
+
+
+def run(url, pool_size, threads, seconds, io_ms):
+    options = engine_options(url)
+    options.update(pool_size=pool_size, max_overflow=0, pool_timeout=60)
+    options.pop('poolclass', None)
+    engine = create_engine(url, **options)
+
+    if url.startswith('postgresql'):
+        query = text('SELECT pg_sleep(:seconds)').bindparams(seconds=io_ms / 1000)
+        client_sleep = 0
+    else:
+        # SQLite answers instantly; hold the connection to mimic network I/O.
+        query = text('SELECT count(*) FROM bench_item')
+        client_sleep = io_ms / 1000
+
+    stop_at = time.perf_counter() + seconds
+    waits = []
+    counts = [0] * threads
+
+    def worker(index):
+        local_waits = []
+        while time.perf_counter() < stop_at:
+            requested = time.perf_counter()
+            with engine.connect() as connection:
+                local_waits.append(time.perf_counter() - requested)
+                connection.execute(query).scalar()
+                if client_sleep:
+                    time.sleep(client_sleep)
+            counts[index] += 1
+        waits.extend(local_waits)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    waits.sort()
+    p95 = waits[int(len(waits) * 0.95) - 1] if waits else 0
+    return sum(counts) / elapsed, statistics.median(waits) if waits else 0, p95
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'))
+    parser.add_argument('--pool-sizes', default='1,2,5,10,20')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--io-ms', type=float, default=2, help='simulated per-query server time')
+    args = parser.parse_args(argv)
+
+    url = args.database_url
+    if not url:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+        url = f'sqlite:///{path}'
+        with create_engine(url).begin() as connection:
+            connection.execute(text('CREATE TABLE bench_item (id INTEGER PRIMARY KEY)'))
+            connection.execute(text('INSERT INTO bench_item (id) VALUES (1), (2), (3)'))
+
+    print(f'{url.split("@")[-1]}: {args.threads} threads, {args.io_ms} ms per query')
+    print(f'{"pool":>5} {"queries/s":>10} {"wait p50 ms":>12} {"wait p95 ms":>12}')
+    for size in (int(value) for value in args.pool_sizes.split(',')):
+        qps, wait_p50, wait_p95 = run(url, size, args.threads, args.seconds, args.io_ms)
+        print(f'{size:>5} {qps:>10.0f} {wait_p50 * 1000:>12.2f} {wait_p95 * 1000:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
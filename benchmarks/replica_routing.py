@@ -0,0 +1,100 @@
+"""Check read-replica routing with two SQLite files.
+
+Seeds a primary database and copies it to a replica that then never
+changes, so every request shows whether it read from the primary or the
+(increasingly stale) replica. Walks through an anonymous catalog read, a
+login, a cart write, a cart read inside the sticky-primary window and one
+after it, and exits with status 1 when a step used the wrong database.
+
+    python benchmarks/replica_routing.py --sticky-seconds 1
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from support import bench_env, build_app, seed
+
+HEADERS = {'X-Forwarded-Proto': 'https'}
+
+
+class EngineCounter:
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.local = threading.local()
+        for name, engine in engines.items():
+            event.listen(engine, 'before_cursor_execute', self.counter(name or 'primary'))
+
+    def counter(self, name):
+        def count(*args):
+            counts = self.local.__dict__.setdefault('counts', {})
+            counts[name] = counts.get(name, 0) + 1
+        return count
+
+    def take(self):
+        counts = getattr(self.local, 'counts', {})
+        self.local.counts = {}
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sticky-seconds', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='nails-replica-')
+    primary = os.path.join(workdir, 'primary.sqlite3')
+    replica = os.path.join(workdir, 'replica.sqlite3')
+    app = build_app(bench_env(
+        workdir,
+        DATABASE_URL=f'sqlite:///{primary}',
+        DATABASE_REPLICA_URL=f'sqlite:///{replica}',
+        REPLICA_STICKY_SECONDS=str(args.sticky_seconds),
+        METRICS_ENABLED='false',
+        LOG_LEVEL='WARNING',
+    ))
+    ids = seed(app, users=1, products=5)
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+    from app.models import db
+    with app.app_context():
+        counter = EngineCounter(db.engines)
+    client = app.test_client()
+    failures = []
+
+    def step(name, expected, method, path, token=None, json=None):
+        headers = dict(HEADERS)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        counter.take()
+        response = client.open(path, method=method, headers=headers, json=json)
+        counts = counter.take()
+        used = sorted(counts)
+        print(f'{name:<34} {method:<6} {response.status_code}  {counts}')
+        if used != [expected]:
+            failures.append(f'{name}: expected only {expected}, used {used}')
+        return response.get_json()
+
+    step('anonymous catalog read', 'replica', 'GET', '/product/read_all')
+    token = step('login', 'primary', 'POST', '/user/login',
+                 json={'username': 'bench0', 'password': 'benchmark'})['access_token']
+    step('add to cart', 'primary', 'POST', '/cart/add_to_cart', token, json={
+        'product_id': ids['products'][0], 'quantity': 2, 'nail_size_option_id': ids['size_options'][0],
+    })
+    cart = step('cart read, inside sticky window', 'primary', 'GET', '/cart/read', token)
+    time.sleep(args.sticky_seconds + 0.1)
+    stale = step('cart read, after sticky window', 'replica', 'GET', '/cart/read', token)
+    print(f'\ncart items: primary {len(cart["items"])}, replica {len(stale["items"])}')
+
+    for failure in failures:
+        print(f'FAILED {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
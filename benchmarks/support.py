@@ -0,0 +1,178 @@
+"""Shared helpers for the benchmark scripts: app setup, seeding, a fake
+Stripe API and a simple threaded load driver."""
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def bench_env(workdir=None, **overrides):
+    """Environment for an app under benchmark.
+
+    Uses ``BENCH_DATABASE_URL`` when set, otherwise a SQLite file in
+    ``workdir``.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='nails-bench-')
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=os.getenv('BENCH_DATABASE_URL') or f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}",
+        JWT_SECRET_KEY='benchmark-jwt-secret',
+        FLASK_SECRET_KEY='benchmark-secret',
+        STRIPE_SECRET_KEY='sk_test_benchmark',
+        STRIPE_PUBLISHABLE_KEY='pk_test_benchmark',
+        DEVELOPER_EMAIL='developer@example.com',
+        PYTHONPATH=ROOT,
+    )
+    env.update(overrides)
+    return env
+
+
+def build_app(env):
+    """Create the app in this process with ``env`` applied.
+
+    ``config.Config`` reads the environment when it is first imported, so
+    this must run before anything imports ``config``.
+    """
+    os.environ.update(env)
+    from app import create_app
+    return create_app()
+
+
+def seed(app, users=1, products=20, size_options=3, stock=10 ** 9):
+    """Create the schema and a small catalog; returns the created ids."""
+    from sqlalchemy import text
+    from app.models import db, User, Product, NailSizeOption, Cart
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.begin() as connection:
+                connection.execute(text('PRAGMA journal_mode=WAL'))
+
+        size_rows = [NailSizeOption(name=f'Size {i}', description=f'Size option {i}') for i in range(size_options)]
+        product_rows = [
+            Product(
+                name=f'Press-on set {i}',
+                description=f'Hand painted press-on nail set number {i} with a glossy finish.',
+                price=12.5 + i,
+                quantity_available=stock,
+                image_url=f'https://example.com/nails/{i}.jpg',
+            )
+            for i in range(products)
+        ]
+        user_rows = [User(username=f'bench{i}', email=f'bench{i}@example.com', password='benchmark') for i in range(users)]
+        db.session.add_all(size_rows + product_rows + user_rows)
+        db.session.flush()
+        db.session.add_all([Cart(user_id=user.user_id, total_amount=0) for user in user_rows])
+        db.session.commit()
+        return {
+            'users': [user.user_id for user in user_rows],
+            'products': [product.product_id for product in product_rows],
+            'size_options': [option.nail_size_option_id for option in size_rows],
+        }
+
+
+def access_token(app, user_id):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return create_access_token(identity=user_id)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeStripe:
+    """Minimal Stripe API stand-in that answers checkout session requests
+    after ``latency_ms``, so benchmarks never hit the real service."""
+
+    def __init__(self, latency_ms=150):
+        latency = latency_ms / 1000
+        counter = iter(range(1, 10 ** 12))
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                time.sleep(latency)
+                session_id = f'cs_test_{next(counter)}'
+                body = json.dumps({
+                    'id': session_id,
+                    'object': 'checkout.session',
+                    'url': f'https://checkout.stripe.com/c/pay/{session_id}',
+                    'client_secret': f'{session_id}_secret',
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_load(task, threads, seconds):
+    """Call ``task(worker_index)`` from ``threads`` threads for ``seconds``.
+
+    Returns ``(elapsed, latencies, errors)`` with latencies in seconds.
+    """
+    stop_at = time.perf_counter() + seconds
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index):
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                task(index)
+            except Exception:
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started, latencies, sum(errors)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,100 @@
+"""Requests/sec for the cart and checkout flows under each gunicorn worker mode.
+
+Starts gunicorn with ``gunicorn.conf.py`` once per mode against a seeded
+database and a fake Stripe API that answers after ``--stripe-latency-ms``.
+
+    python benchmarks/worker_modes.py --modes sync,gthread,gevent --clients 32
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from support import ROOT, FakeStripe, access_token, bench_env, build_app, free_port, percentile, run_load, seed
+
+
+def request(base_url, method, path, token, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers={
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json',
+        # app.headers would redirect plain HTTP to HTTPS otherwise
+        'X-Forwarded-Proto': 'https',
+    })
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return json.loads(response.read() or b'null')
+
+
+def wait_until_ready(base_url, process, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit('gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(urllib.request.Request(
+                base_url + '/product/read_all', headers={'X-Forwarded-Proto': 'https'}), timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('gunicorn did not become ready')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--stripe-latency-ms', type=float, default=150)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='nails-bench-')
+    with FakeStripe(args.stripe_latency_ms) as stripe:
+        env = bench_env(workdir, STRIPE_API_BASE=stripe.url, WEB_CONCURRENCY=str(args.workers))
+        app = build_app(env)
+        ids = seed(app, users=args.clients)
+        tokens = [access_token(app, user_id) for user_id in ids['users']]
+        product_id = ids['products'][0]
+        size_option_id = ids['size_options'][0]
+
+        rows = []
+        for mode in args.modes.split(','):
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), '--bind', f'127.0.0.1:{port}'],
+                cwd=ROOT, env=dict(env, GUNICORN_WORKER_MODE=mode),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_until_ready(base_url, process)
+
+                def cart_flow(index):
+                    request(base_url, 'POST', '/cart/add_to_cart', tokens[index], {
+                        'product_id': product_id, 'quantity': 1, 'nail_size_option_id': size_option_id,
+                    })
+                    request(base_url, 'GET', '/cart/read', tokens[index])
+
+                def checkout_flow(index):
+                    order = request(base_url, 'POST', '/order/create_preliminary_order', tokens[index], {'total_amount': 25.0})
+                    request(base_url, 'POST', '/create-checkout-session', tokens[index], {'order_id': order['order_id']})
+
+                for flow_name, flow in (('cart', cart_flow), ('checkout', checkout_flow)):
+                    elapsed, latencies, errors = run_load(flow, args.clients, args.seconds)
+                    rows.append((mode, flow_name, len(latencies) * 2 / elapsed, percentile(latencies, 50), percentile(latencies, 95), errors))
+            finally:
+                process.terminate()
+                process.wait()
+
+    print(f'{args.workers} workers, {args.clients} clients, Stripe latency {args.stripe_latency_ms:.0f} ms')
+    print(f'{"mode":<8} {"flow":<9} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+    for mode, flow_name, rps, p50, p95, errors in rows:
+        print(f'{mode:<8} {flow_name:<9} {rps:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
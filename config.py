@@ -1,20 +1,134 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def database_url(name="DATABASE_URL"):
+    url = os.environ.get(name)
+    # Render hands out postgres:// URLs, which SQLAlchemy 2 no longer accepts.
+    if url and url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url):
+    """SQLAlchemy engine options for ``url``, tuned through DB_* variables.
+
+    With ``DB_PGBOUNCER`` set the app sits behind pgbouncer in transaction
+    mode: pooling is left to pgbouncer (``NullPool``) and no startup
+    ``options`` are sent, since pgbouncer rejects them. psycopg2 never
+    creates server-side prepared statements, so nothing else is needed for
+    the sync driver.
+    """
+    options = {
+        "pool_pre_ping": env_bool("DB_POOL_PRE_PING", True),
+        "pool_recycle": env_int("DB_POOL_RECYCLE", 1800),
+    }
+    if not url or url.startswith("sqlite"):
+        return options
+
+    connect_args = {
+        "connect_timeout": env_int("DB_CONNECT_TIMEOUT", 10),
+        "application_name": os.environ.get("DB_APPLICATION_NAME", "custom-nails-backend"),
+    }
+    if env_bool("DB_PGBOUNCER"):
+        from sqlalchemy.pool import NullPool
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=env_int("DB_POOL_SIZE", 5),
+            max_overflow=env_int("DB_MAX_OVERFLOW", 10),
+            pool_timeout=env_int("DB_POOL_TIMEOUT", 30),
+            pool_use_lifo=True,
+        )
+        statement_timeout = env_int("DB_STATEMENT_TIMEOUT_MS", 30000)
+        if statement_timeout:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout}"
+    options["connect_args"] = connect_args
+    return options
+
+
+def async_engine_options(url):
+    """Engine options for the async request path (see ``app.async_db``).
+
+    Flask runs every async view in its own event loop and asyncpg
+    connections cannot move between loops, so the async engine never pools
+    (``NullPool``). asyncpg prepares statements server-side; behind
+    pgbouncer both of its statement caches are disabled.
+    """
+    from sqlalchemy.pool import NullPool
+    options = {"poolclass": NullPool}
+    if not url or not url.startswith("postgresql"):
+        return options
+
+    connect_args = {"timeout": env_int("DB_CONNECT_TIMEOUT", 10)}
+    if env_bool("DB_PGBOUNCER"):
+        connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+    else:
+        connect_args["server_settings"] = {
+            "application_name": os.environ.get("DB_APPLICATION_NAME", "custom-nails-backend"),
+            "statement_timeout": str(env_int("DB_STATEMENT_TIMEOUT_MS", 30000)),
+        }
+    options["connect_args"] = connect_args
+    return options
+
+
 class Config:
     FLASK_APP = os.environ.get("FLASK_APP")
     FLASK_DEBUG = os.environ.get("FLASK_DEBUG")
-    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_ASYNC_ENGINE_OPTIONS = async_engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Read replica (app/db_routing.py). When set, read-only requests read
+    # from it, except for users who wrote in the last REPLICA_STICKY_SECONDS.
+    DATABASE_REPLICA_URL = database_url("DATABASE_REPLICA_URL")
+    SQLALCHEMY_BINDS = (
+        {"replica": {"url": DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL)}}
+        if DATABASE_REPLICA_URL else {}
+    )
+    REPLICA_STICKY_SECONDS = env_int("REPLICA_STICKY_SECONDS", 5)
+
     # FLASK JWT EXTENDED
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
     JWT_TOKEN_LOCATION = ['headers']
 
     STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY")
     STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY")
+    STRIPE_API_BASE = os.environ.get("STRIPE_API_BASE")
+    # Signing secret of the /stripe/webhook endpoint; the webhook answers 503
+    # until it is set.
+    STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
+
+    # Users allowed on /admin routes, as a comma-separated list of user ids.
+    ADMIN_USER_IDS = {value.strip() for value in os.environ.get("ADMIN_USER_IDS", "").split(",") if value.strip()}
+
+    # Shared across workers when CACHE_REDIS_URL is set; otherwise each
+    # process keeps its own in-memory cache.
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+    CACHE_TYPE = "RedisCache" if CACHE_REDIS_URL else "SimpleCache"
+    CACHE_DEFAULT_TIMEOUT = env_int("CACHE_DEFAULT_TIMEOUT", 300)
+
+    # Idempotency-Key handling (app/idempotency.py), kept in the cache above,
+    # so retries only deduplicate across workers when CACHE_REDIS_URL is set.
+    IDEMPOTENCY_TTL = env_int("IDEMPOTENCY_TTL", 86400)
+    IDEMPOTENCY_LOCK_SECONDS = env_int("IDEMPOTENCY_LOCK_SECONDS", 60)
+    IDEMPOTENCY_WAIT_SECONDS = env_int("IDEMPOTENCY_WAIT_SECONDS", 10)
 
     DEVELOPER_EMAIL = os.environ.get("DEVELOPER_EMAIL")
 
@@ -36,6 +150,129 @@ class Config:
 
     SERVICE_ACCOUNT_FILE = os.environ.get('SERVICE_ACCOUNT_FILE')
 
+    # Logging (app/request_logging.py). Logs go to stdout, plus LOG_FILE when
+    # set. LOG_SAMPLE_RATE keeps that share of requests' INFO logs; warnings
+    # and errors are always kept.
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_FILE = os.environ.get("LOG_FILE")
+    LOG_MAX_BYTES = env_int("LOG_MAX_BYTES", 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = env_int("LOG_BACKUP_COUNT", 5)
+    LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+
+    # Prometheus metrics (app/metrics.py), served at /metrics. Set
+    # METRICS_TOKEN to require "Authorization: Bearer <token>" on scrapes.
+    METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+    # Statements slower than this are logged with their plan
+    # (app/slow_queries.py); 0 turns fingerprinting and the log off.
+    SLOW_QUERY_THRESHOLD_MS = env_int("SLOW_QUERY_THRESHOLD_MS", 200)
+    SLOW_QUERY_EXPLAIN = env_bool("SLOW_QUERY_EXPLAIN", True)
+
+    # Request profiling (app/profiling.py). Off unless PROFILE_SECRET is set
+    # (for signed X-Profile-Token headers, see `flask profiles token`) or
+    # PROFILE_SAMPLE_RATE is above 0.
+    PROFILE_SECRET = os.environ.get("PROFILE_SECRET")
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "nail-shop-profiles"))
+    PROFILE_MAX_FILES = env_int("PROFILE_MAX_FILES", 200)
+    PROFILE_TOKEN_MAX_AGE = env_int("PROFILE_TOKEN_MAX_AGE", 3600)
+
+    # Rows per upsert transaction in product imports, and how many per-row
+    # errors a response lists (app/product_import.py).
+    PRODUCT_IMPORT_BATCH_SIZE = env_int("PRODUCT_IMPORT_BATCH_SIZE", 1000)
+    PRODUCT_IMPORT_MAX_ERRORS = env_int("PRODUCT_IMPORT_MAX_ERRORS", 100)
+
+    # Most ids one /product/batch request may ask for.
+    PRODUCT_BATCH_MAX_IDS = env_int("PRODUCT_BATCH_MAX_IDS", 100)
+
+    # How often each process's background thread checks whether another one
+    # changed products and its typeahead index needs a rebuild
+    # (app/typeahead.py). Without CACHE_REDIS_URL the check is a cheap
+    # count/max/length probe of the product table.
+    TYPEAHEAD_REFRESH_SECONDS = env_int("TYPEAHEAD_REFRESH_SECONDS", 5)
+
+    # Response compression (app/compression.py). Brotli is used when the
+    # Brotli package is installed and the client accepts it, gzip otherwise.
+    COMPRESS_ENABLED = env_bool("COMPRESS_ENABLED", True)
+    COMPRESS_MIN_SIZE = env_int("COMPRESS_MIN_SIZE", 1024)
+    COMPRESS_GZIP_LEVEL = env_int("COMPRESS_GZIP_LEVEL", 6)
+    COMPRESS_BROTLI_QUALITY = env_int("COMPRESS_BROTLI_QUALITY", 4)
+    COMPRESS_MIMETYPES = [
+        "application/json", "application/x-ndjson", "text/csv", "text/html", "text/plain",
+    ]
+
+    # How often each process checks whether its size option table is stale
+    # (app/size_options.py). Without CACHE_REDIS_URL there is nothing to
+    # check, and it reloads every time.
+    SIZE_OPTIONS_REFRESH_SECONDS = env_int("SIZE_OPTIONS_REFRESH_SECONDS", 30)
+
+    # Security and CORS headers (app/headers.py)
+    CORS_ORIGINS = [
+        origin.strip() for origin in
+        os.environ.get("CORS_ORIGINS", "https://localhost:3000,https://nail-shop.onrender.com").split(",")
+        if origin.strip()
+    ]
+    CORS_MAX_AGE = env_int("CORS_MAX_AGE", 600)
+    FORCE_HTTPS = env_bool("FORCE_HTTPS", True)
+    # Paths served over plain HTTP too, for in-cluster scrapers and health
+    # checks that never go through the TLS-terminating proxy.
+    FORCE_HTTPS_EXEMPT_PATHS = [
+        path.strip() for path in os.environ.get("FORCE_HTTPS_EXEMPT_PATHS", "/metrics").split(",") if path.strip()
+    ]
+    HSTS_MAX_AGE = env_int("HSTS_MAX_AGE", 31556926)
+    CONTENT_SECURITY_POLICY = {
+        'default-src': ["'self'"],
+        'script-src': [
+            "'self'", "'unsafe-inline'", "'unsafe-eval'",
+            'https://js.stripe.com',
+            'https://custom-nails-backend.example.com',  # Replace with your backend domain
+            'https://nail-shop.example.com'  # Replace with your frontend domain
+        ],
+        'connect-src': [
+            "'self'",
+            'https://api.stripe.com',
+            'https://custom-nails-backend.example.com',  # Replace with your backend domain
+            'https://nail-shop.example.com'  # Replace with your frontend domain
+        ],
+        'frame-src': [
+            'https://js.stripe.com',
+            'https://custom-nails-backend.example.com',  # Replace with your backend domain
+            'https://nail-shop.example.com'  # Replace with your frontend domain
+        ],
+        'img-src': [
+            "'self'", 'data:', 'https://*.stripe.com',
+            'https://custom-nails-backend.example.com',  # Replace with your backend domain
+            'https://nail-shop.example.com'  # Replace with your frontend domain
+        ],
+        'style-src': [
+            "'self'", "'unsafe-inline'",
+            'https://custom-nails-backend.example.com',  # Replace with your backend domain
+            'https://nail-shop.example.com'  # Replace with your frontend domain
+        ]
+    }
+
     # Add a secret key for Flask session management
     FLASK_SECRET_KEY = os.environ.get('FLASK_SECRET_KEY')
 
+    # Server-side sessions (app/session_store.py). Redis when SESSION_REDIS_URL
+    # is set, otherwise a SQLite file shared by the workers on this host.
+    SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL')
+    SESSION_SQLITE_PATH = os.environ.get(
+        'SESSION_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'nail-shop-sessions.sqlite3')
+    )
+    SESSION_TTL = env_int('SESSION_TTL', 3600)
+    SESSION_CLEANUP_INTERVAL = env_int('SESSION_CLEANUP_INTERVAL', 300)
+    SESSION_COOKIE_SECURE = True
+    SESSION_COOKIE_HTTPONLY = True
+    SESSION_COOKIE_SAMESITE = 'Lax'
+
+    # Cart store (app/cart_store.py). 'redis' or 'memory' serves carts from
+    # the store and writes them to the cart tables every CART_FLUSH_INTERVAL
+    # seconds; empty keeps carts in the database only. 'memory' is per
+    # process and only suits tests and single-process runs.
+    CART_STORE = os.environ.get('CART_STORE', '')
+    CART_REDIS_URL = os.environ.get('CART_REDIS_URL', 'redis://localhost:6379/1')
+    CART_FLUSH_INTERVAL = env_int('CART_FLUSH_INTERVAL', 2)
+    CART_TTL = env_int('CART_TTL', 86400)
+
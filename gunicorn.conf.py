@@ -0,0 +1,62 @@
+import os
+from config import env_bool, env_int
+
+wsgi_app = 'run:app'
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = env_int('WEB_CONCURRENCY', 2)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+preload_app = env_bool('GUNICORN_PRELOAD', False)
+
+# Most request time is spent waiting on Postgres, Stripe and SMTP, so a
+# cooperative worker lets one process serve many requests at once.
+#   sync    - one request per worker
+#   gthread - GUNICORN_THREADS requests per worker on OS threads
+#   gevent  - GUNICORN_WORKER_CONNECTIONS requests per worker on greenlets
+# Keep DB_POOL_SIZE + DB_MAX_OVERFLOW close to the per-worker concurrency.
+worker_mode = os.getenv('GUNICORN_WORKER_MODE', 'sync')
+if worker_mode == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = env_int('GUNICORN_WORKER_CONNECTIONS', 100)
+elif worker_mode == 'gthread':
+    worker_class = 'gthread'
+    threads = env_int('GUNICORN_THREADS', 8)
+elif worker_mode == 'sync':
+    worker_class = 'sync'
+else:
+    raise ValueError(f"Unknown GUNICORN_WORKER_MODE: {worker_mode!r}")
+
+
+def on_starting(server):
+    # Metrics files left over from a previous run would be merged into the
+    # new server's totals.
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            if name.endswith('.db'):
+                os.remove(os.path.join(multiproc_dir, name))
+
+
+def post_fork(server, worker):
+    # With preload_app the engine pools were created in the master process;
+    # each worker must open its own connections instead of sharing sockets.
+    # The log listener thread did not survive the fork either.
+    if server.cfg.preload_app:
+        from app.database import dispose_engines
+        from app.request_logging import restart_listener
+        dispose_engines(server.app.wsgi())
+        restart_listener()
+
+
+def post_worker_init(worker):
+    # psycopg2 is a C extension that gevent cannot monkey-patch; install a
+    # wait callback so queries yield to other greenlets instead of blocking.
+    if worker_mode == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)